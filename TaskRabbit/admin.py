@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from TaskRabbit.models import Project, Task
+from TaskRabbit.models import Job, Project, Task
 
 admin.site.register(Project)
-admin.site.register(Task)
\ No newline at end of file
+admin.site.register(Task)
+admin.site.register(Job)
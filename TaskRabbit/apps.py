@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class TaskrabbitConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'TaskRabbit'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .database import apply_pragmas
+        from .search import restore_fts_triggers
+
+        post_migrate.connect(restore_fts_triggers, sender=self)
+        connection_created.connect(apply_pragmas)
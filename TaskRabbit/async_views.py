@@ -0,0 +1,152 @@
+"""
+Async read-only endpoints for projects and tasks, under /async/.
+
+They answer like the list and retrieve actions of the viewsets: the same cursor pages, the
+project cache, the ETag/Last-Modified validators and ?fields=/?expand=, through the viewset
+mixins. The pages are read with Django's async ORM (`aiterator`, `aget`). Served by an ASGI
+server (see benmore/gunicorn_asgi.py), a request waiting on a slow query no longer holds a
+worker: the event loop keeps accepting and answering other connections meanwhile.
+
+Django still runs the queries themselves on a thread, the async ORM wraps the sync one, so
+the gain is in concurrent connections, not in per-query speed. The steps that query through
+the sync ORM, such as prefetching the members, run in sync_to_async().
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetMixin
+from .filters import filter_projects, filter_tasks
+from .lean import lean_tasks
+from .models import Project, Task
+from .pagination import DateCreatedCursorPagination
+from .renderers import FastJSONRenderer
+from .search import get_search_backend
+from .serializers import TaskSerializer
+from .views import ProjectSerializationMixin, TaskViewSet
+
+
+class AsyncView(ConditionalGetMixin):
+    """
+    What the viewset mixins read from their view, for one request to an async endpoint.
+    """
+
+    def __init__(self, request, action):
+        self.request = Request(request)
+        # The responses are JSON, negotiated by DRF for the viewsets.
+        self.request.accepted_renderer = FastJSONRenderer()
+        self.action = action
+        self.paginator = DateCreatedCursorPagination()
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'format': None, 'view': self}
+
+    def paginated_response(self, data, validators):
+        return self.set_validators(JsonResponse({
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+            'results': data,
+        }), *validators)
+
+
+class ProjectView(ProjectSerializationMixin, AsyncView):
+    pass
+
+
+class TaskView(SparseFieldsetMixin, AsyncView):
+    field_columns = TaskViewSet.field_columns
+
+    def get_fieldset_serializer_class(self):
+        return TaskSerializer
+
+
+async def search(queryset, request):
+    term = request.GET.get('search', '').strip()
+    if not term:
+        return queryset
+    # The FTS backend looks its tables up once per process, a sync query.
+    return await sync_to_async(get_search_backend().search)(queryset, term)
+
+
+def api_errors(view):
+    """
+    Answers the API exceptions of the filters and the pagination, like DRF does for the
+    viewsets.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as error:
+            detail = error.detail if isinstance(error.detail, (dict, list)) else {'detail': error.detail}
+            return JsonResponse(detail, status=error.status_code, safe=False)
+    return wrapper
+
+
+@api_errors
+async def project_list(request):
+    """
+    A page of projects, with the filters and search of GET /projects/.
+    """
+    view = ProjectView(request, 'list')
+    queryset = filter_projects(Project.objects.all(), view.request.query_params)
+    queryset = view.project_rows(await search(queryset, request))
+    rows = await view.paginator.apaginate_queryset(queryset, view.request)
+
+    validators = view.get_page_validators(rows)
+    not_modified = view.get_not_modified_response(*validators)
+    if not_modified is not None:
+        return not_modified
+    return view.paginated_response(await sync_to_async(view.serialize_projects)(rows), validators)
+
+
+@api_errors
+async def project_detail(request, pk):
+    view = ProjectView(request, 'retrieve')
+    try:
+        project = await view.only_fieldset(Project.objects.all()).aget(pk=pk)
+    except Project.DoesNotExist:
+        raise Http404('No Project matches the given query.')
+
+    validators = await sync_to_async(view.get_project_validators)(project)
+    not_modified = view.get_not_modified_response(*validators)
+    if not_modified is not None:
+        return not_modified
+    data = (await sync_to_async(view.serialize_projects)([project]))[0]
+    return view.set_validators(JsonResponse(data), *validators)
+
+
+@api_errors
+async def task_list(request):
+    """
+    A page of tasks, with the filters and search of GET /tasks/.
+    """
+    view = TaskView(request, 'list')
+    queryset = filter_tasks(Task.objects.all(), view.request.query_params)
+    queryset = view.values_fieldset(await search(queryset, request))
+    rows = await view.paginator.apaginate_queryset(queryset, view.request)
+
+    validators = view.get_page_validators(rows)
+    not_modified = view.get_not_modified_response(*validators)
+    if not_modified is not None:
+        return not_modified
+    return view.paginated_response(lean_tasks(rows, view.get_fieldset()), validators)
+
+
+@api_errors
+async def task_detail(request, pk):
+    view = TaskView(request, 'retrieve')
+    try:
+        task = await view.only_fieldset(Task.objects.all()).aget(pk=pk)
+    except Task.DoesNotExist:
+        raise Http404('No Task matches the given query.')
+
+    validators = view.get_validators(task.updated_at, task.pk)
+    not_modified = view.get_not_modified_response(*validators)
+    if not_modified is not None:
+        return not_modified
+    return view.set_validators(JsonResponse(TaskSerializer(task, fields=view.get_fieldset()).data), *validators)
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import replica
+
+
+class ProjectCache:
+    """
+    Cache of serialized projects, keyed on the `updated_at` of their rows.
+
+    Every write that changes the representation of a project moves its updated_at forward:
+    saves, task counter updates, and member changes through TaskRabbit.signals.touch_projects.
+    A row read after the write asks for a new key, so entries are never evicted, the old ones
+    simply age out of the cache. Nothing has to reach the caches of other processes, the web
+    workers and the job and management commands alike, and a row loaded before a concurrent
+    write keeps its old key rather than caching its data as the new version.
+
+    Hit and miss counters are kept per process, like the local-memory cache they describe.
+    """
+    prefix = 'taskrabbit:project'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PROJECT_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'PROJECT_CACHE_TTL', 300)
+
+    def key(self, project, variant):
+        if isinstance(project, dict):
+            pk, updated_at = project['id'], project['updated_at']
+        else:
+            pk, updated_at = project.pk, project.updated_at
+        return f'{self.prefix}:{pk}:{updated_at.isoformat()}:{variant}'
+
+    def get_many(self, projects, variant, render):
+        """
+        Returns the representations of `projects`, model instances or `.values()` rows with
+        their updated_at, in order, rendering the ones that are not cached with
+        `render(missing_projects)`.
+
+        `variant` tells apart representations of the same project version, e.g. built for
+        another host or with other query parameters.
+
+        Representations rendered from a read replica are not stored: a lagging replica returns
+        rows at an older updated_at, which the reads of the primary never ask for again.
+        """
+        variant = hashlib.md5(variant.encode()).hexdigest()
+        keys = [self.key(project, variant) for project in projects]
+        found = self.cache.get_many(keys)
+
+        missing = [(key, project) for key, project in zip(keys, projects) if key not in found]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            rendered = render([project for _, project in missing])
+            fresh = {key: data for (key, _), data in zip(missing, rendered)}
+            if replica.get() not in getattr(settings, 'DATABASE_REPLICAS', []):
+                self.cache.set_many(fresh, timeout=self.timeout)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'ttl': self.timeout,
+        }
+
+
+project_cache = ProjectCache()
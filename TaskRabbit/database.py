@@ -0,0 +1,74 @@
+"""
+SQLite tuning: pragmas applied to every new connection, and retries of the writes that find
+the database locked.
+
+The pragmas are the SQLITE_PRAGMAS setting, picked from SQLITE_PROFILES by SQLITE_PROFILE.
+The production profile switches the database to write-ahead logging, where readers no longer
+wait for the writer and the writer no longer waits for readers. Writers still take turns:
+a writer waits up to busy_timeout for the lock, and retry_on_locked runs the whole write
+again when it gets "database is locked" anyway.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """
+    connection_created receiver setting SQLITE_PRAGMAS on new SQLite connections.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # Read-only replicas cannot change their journal mode, they keep the one of their file.
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            if not (read_only and name == 'journal_mode'):
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def retry_on_locked(func=None, *, using=DEFAULT_DB_ALIAS):
+    """
+    Runs `func` in a transaction, again when it fails because the database is locked, up to
+    DB_LOCK_RETRIES times with an exponential backoff starting at DB_LOCK_BACKOFF seconds.
+    A retry that could not be over, its busy_timeout wait included, within DB_LOCK_MAX_WAIT
+    seconds of the first attempt is not made.
+
+    The transaction makes every attempt all or nothing. Inside an outer transaction `func` is
+    simply called: only that transaction can be retried as a whole.
+    """
+    if func is None:
+        return functools.partial(retry_on_locked, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connections[using].in_atomic_block:
+            return func(*args, **kwargs)
+        retries = getattr(settings, 'DB_LOCK_RETRIES', 5)
+        backoff = getattr(settings, 'DB_LOCK_BACKOFF', 0.05)
+        busy_timeout = getattr(settings, 'SQLITE_PRAGMAS', {}).get('busy_timeout', 0) / 1000
+        deadline = time.monotonic() + getattr(settings, 'DB_LOCK_MAX_WAIT', 20)
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_locked(error) or attempt == retries:
+                    raise
+                # Jittered, so that the writers that collided do not collide again.
+                delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                if time.monotonic() + delay + busy_timeout > deadline:
+                    raise
+                logger.warning('%s found the database locked, retrying in %.3fs.', func.__qualname__, delay)
+                time.sleep(delay)
+    return wrapper
@@ -0,0 +1,75 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import filter_projects, filter_tasks
+from .models import Project, Task
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Columns of each export, read with values_list() so no model instances are built.
+PROJECT_COLUMNS = ('id', 'title', 'display_photo', 'date_created', 'updated_at', 'due_date',
+                   'total_tasks', 'completed_tasks')
+TASK_COLUMNS = ('id', 'title', 'project_id', 'project__title', 'complete', 'date_created', 'updated_at')
+
+# Size of the chunks the encoded rows are yielded in: one row per chunk would cost a write
+# and, once compressed, a flush of the compressor for every row.
+BUFFER_SIZE = 64 * 1024
+
+
+def export_queryset(kind, params):
+    """
+    Returns the column names and the filtered project or task rows to export, as tuples in
+    primary key order.
+    """
+    if kind == 'projects':
+        columns, queryset = PROJECT_COLUMNS, filter_projects(Project.objects.all(), params)
+    else:
+        columns, queryset = TASK_COLUMNS, filter_tasks(Task.objects.all(), params)
+    names = [column.replace('__', '_') for column in columns]
+    return names, queryset.order_by('pk').values_list(*columns)
+
+
+class Echo:
+    """
+    File-like object handing back what csv.writer writes to it.
+    """
+    def write(self, value):
+        return value
+
+
+def encode_rows(columns, rows, export_format):
+    """
+    Yields the rows encoded as NDJSON lines or CSV records, after a CSV header.
+    """
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns).encode()
+        for row in rows:
+            yield writer.writerow(row).encode()
+    else:
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        for row in rows:
+            yield (encoder.encode(dict(zip(columns, row))) + '\n').encode()
+
+
+def iter_export(columns, queryset, export_format, chunk_size=2000, buffer_size=BUFFER_SIZE):
+    """
+    Yields the rows of `queryset` encoded as NDJSON lines or CSV records, in chunks of about
+    buffer_size bytes.
+
+    Rows are streamed from the database with a server-side iterator, chunk_size at a time,
+    so memory use stays flat whatever the row count.
+    """
+    buffer, size = [], 0
+    for record in encode_rows(columns, queryset.iterator(chunk_size=chunk_size), export_format):
+        buffer.append(record)
+        size += len(record)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
@@ -0,0 +1,82 @@
+from datetime import datetime, time
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_moment(name, value):
+    """
+    Parses an ISO 8601 date or datetime query parameter, dates meaning their midnight.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_created(queryset, params):
+    """
+    Applies the created_after (inclusive) and created_before (exclusive) date range.
+    """
+    if params.get('created_after'):
+        queryset = queryset.filter(date_created__gte=parse_moment('created_after', params['created_after']))
+    if params.get('created_before'):
+        queryset = queryset.filter(date_created__lt=parse_moment('created_before', params['created_before']))
+    return queryset
+
+
+def parse_id(name, value):
+    try:
+        pk = int(value)
+    except ValueError:
+        pk = 0
+    if pk < 1:
+        raise ValidationError({name: 'Expected an ID.'})
+    return pk
+
+
+def filter_projects(queryset, params):
+    """
+    Filters projects by completion status, member and creation date range.
+
+    'completed=true' keeps projects whose tasks are all complete (including projects without tasks),
+    'completed=false' keeps projects that are partially complete: at least one task done, but not all.
+    Both read the denormalized task counters.
+    """
+    completed = params.get('completed')
+    if completed == 'true':
+        queryset = queryset.filter(completed_tasks=F('total_tasks'))
+    elif completed == 'false':
+        queryset = queryset.filter(completed_tasks__gt=0, completed_tasks__lt=F('total_tasks'))
+    if params.get('member'):
+        # Joins the members through table on its (user_id, project_id) index.
+        queryset = queryset.filter(members=parse_id('member', params['member']))
+    return filter_created(queryset, params)
+
+
+def filter_tasks(queryset, params):
+    """
+    Filters tasks by project, project member, completion status and creation date range.
+    """
+    project_id = params.get('project')
+    completed = params.get('completed')
+
+    if project_id:
+        queryset = queryset.filter(project=project_id)
+    if completed is not None:
+        if completed not in ('true', 'false'):
+            raise ValidationError({'completed': 'Expected true or false.'})
+        queryset = queryset.filter(complete=(completed == 'true'))
+    if params.get('member'):
+        queryset = queryset.filter(project__members=parse_id('member', params['member']))
+    return filter_created(queryset, params)
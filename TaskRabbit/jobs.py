@@ -0,0 +1,210 @@
+"""
+Database backed job queue, run by `python manage.py run_jobs`.
+
+Jobs are rows of the Job model. Workers claim the next due job with a conditional UPDATE,
+so any number of them can poll the same database without an external broker. Failed jobs
+are retried with exponential backoff until they run out of attempts.
+"""
+import io
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Job, Project
+from .thumbnails import generate_thumbnails
+
+logger = logging.getLogger(__name__)
+
+# Photo formats kept when re-encoding uploads, and their extension. Others become JPEG.
+PHOTO_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+# kind -> (handler(**payload), on_failure(**payload) or None)
+handlers = {}
+
+
+class PermanentJobError(Exception):
+    """
+    Raised by handlers for failures that retrying cannot fix.
+    """
+
+
+def handler(kind, on_failure=None):
+    """
+    Registers the decorated function as the handler of the jobs of `kind`, `on_failure`
+    being called with the same payload once such a job has failed for good.
+    """
+    def register(func):
+        handlers[kind] = (func, on_failure)
+        return func
+    return register
+
+
+def enqueue(kind, **payload):
+    """
+    Queues a job, or runs it right away when the JOBS_EAGER setting is on.
+    """
+    job = Job.objects.create(
+        kind=kind, payload=payload, max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        # Run once the surrounding transaction, which created the job, commits.
+        transaction.on_commit(lambda: claim_and_run(job.pk, worker='eager'))
+    return job
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_DELAY', 10)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_MAX_RETRY_DELAY', 3600)))
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(pk, worker):
+    """
+    Marks a queued job as running for `worker`, returns whether this worker got it.
+    """
+    now = timezone.now()
+    return bool(Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+    ))
+
+
+def claim_next(worker):
+    """
+    Claims the next due job, returns None when there is none.
+    """
+    while True:
+        pk = (Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+              .order_by('run_after', 'pk').values_list('pk', flat=True).first())
+        if pk is None:
+            return None
+        if claim(pk, worker):
+            return Job.objects.get(pk=pk)
+        # Another worker was faster, look for the next one.
+
+
+def run(job):
+    """
+    Runs a claimed job and records its outcome, scheduling a retry if it failed.
+    """
+    func, on_failure = handlers.get(job.kind, (None, None))
+    try:
+        if func is None:
+            raise PermanentJobError(f'No handler for job kind {job.kind!r}.')
+        func(**job.payload)
+    except Exception as error:
+        job.last_error = traceback.format_exc()
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error('Job %s failed: %s', job, error)
+            if on_failure is not None:
+                # The job is recorded as failed whatever the callback does.
+                try:
+                    on_failure(**job.payload)
+                except Exception:
+                    logger.exception('on_failure of job %s failed', job)
+                    job.last_error += '\non_failure:\n' + traceback.format_exc()
+        else:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+            logger.warning('Job %s failed, retrying at %s: %s', job, job.run_after, error)
+    else:
+        job.status = Job.DONE
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'last_error', 'run_after', 'locked_by', 'locked_at', 'updated_at'])
+    return job
+
+
+def claim_and_run(pk, worker):
+    if claim(pk, worker):
+        return run(Job.objects.get(pk=pk))
+    return None
+
+
+def requeue_stale(older_than):
+    """
+    Queues again the jobs left running by workers that died, for longer than `older_than`.
+    """
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - older_than).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, updated_at=timezone.now(),
+    )
+
+
+def photo_name(digest, ext):
+    """
+    Returns the storage name of a processed photo, derived from the hash of its content.
+    """
+    return f'project_photos/{digest[:2]}/{digest}.{ext}'
+
+
+def set_photo_status(project_id, status):
+    project = Project.objects.filter(pk=project_id).first()
+    if project is not None:
+        project.photo_status = status
+        project.save(update_fields=['photo_status', 'updated_at'])
+
+
+def photo_failed(project_id, photo):
+    set_photo_status(project_id, 'failed')
+
+
+@handler('process_project_photo', on_failure=photo_failed)
+def process_project_photo(project_id, photo):
+    """
+    Validates an uploaded project photo, strips its metadata by re-encoding it, and renders
+    its thumbnails. Skipped when the project got another photo since the job was queued.
+    """
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None or project.display_photo.name != photo:
+        return
+
+    set_photo_status(project_id, 'processing')
+    try:
+        with project.display_photo.open('rb') as upload:
+            content = upload.read()
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image.verify()
+            with Image.open(io.BytesIO(content)) as image:
+                fmt = image.format if image.format in PHOTO_FORMATS else 'JPEG'
+                # Applies the EXIF orientation to the pixels, the re-encoded file keeps no EXIF.
+                image = ImageOps.exif_transpose(image)
+                if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt, quality=90)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as error:
+            raise PermanentJobError(f'Not a valid image: {error}') from error
+
+        content = buffer.getvalue()
+        digest = generate_thumbnails(content)
+    except Exception:
+        # Back to pending while the job waits for its retry.
+        set_photo_status(project_id, 'pending')
+        raise
+
+    # Swap in the clean photo last, so that a retry still finds the original upload. Its name
+    # is content-addressed, so it is served with an immutable Cache-Control.
+    storage = project.display_photo.storage
+    name = photo_name(digest, PHOTO_FORMATS[fmt])
+    if not storage.exists(name):
+        storage.save(name, ContentFile(content))
+    project.display_photo.name = name
+    project.photo_digest = digest
+    project.photo_status = 'ready'
+    project.save(update_fields=['display_photo', 'photo_digest', 'photo_status', 'updated_at'])
+    if photo != name:
+        storage.delete(photo)
@@ -0,0 +1,46 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from TaskRabbit.models import Project
+from TaskRabbit.thumbnails import generate_thumbnails_for_file
+
+
+class Command(BaseCommand):
+    help = "Renders the missing thumbnails of existing project photos, in a pool of processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Also process projects whose thumbnails were already generated.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes, defaults to the number of CPUs.")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.exclude(display_photo='')
+        if not options['all']:
+            projects = projects.filter(photo_digest='')
+
+        # Projects sharing a photo file are rendered once.
+        photos = {}
+        for pk, name in projects.values_list('pk', 'display_photo').iterator():
+            photos.setdefault(name, []).append(pk)
+        if not photos:
+            self.stdout.write("No thumbnails to generate.")
+            return
+
+        failed = 0
+        with ProcessPoolExecutor(options['workers']) as executor:
+            futures = {name: executor.submit(generate_thumbnails_for_file, name) for name in photos}
+            for name, future in futures.items():
+                try:
+                    _, digest = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                    continue
+                Project.objects.filter(pk__in=photos[name]).update(photo_digest=digest, updated_at=timezone.now())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated thumbnails for {len(photos) - failed} photo(s), {failed} failed."
+        ))
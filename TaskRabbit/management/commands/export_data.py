@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from TaskRabbit.export import EXPORT_FORMATS, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = "Streams every project or task to NDJSON or CSV, with the filters of the API lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['projects', 'tasks'])
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help="File to write to, standard output by default.")
+        parser.add_argument('--project', help="Only export the tasks of this project ID.")
+        parser.add_argument('--completed', choices=['true', 'false'])
+        parser.add_argument('--created-after', help="ISO 8601 date or datetime, inclusive.")
+        parser.add_argument('--created-before', help="ISO 8601 date or datetime, exclusive.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name] for name in ('project', 'completed', 'created_after', 'created_before')
+            if options[name] is not None
+        }
+        try:
+            columns, queryset = export_queryset(options['kind'], params)
+            chunks = iter_export(columns, queryset, options['export_format'], chunk_size=options['chunk_size'])
+            output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+            try:
+                for chunk in chunks:
+                    output.write(chunk)
+            finally:
+                if options['output']:
+                    output.close()
+        except ValidationError as error:
+            raise CommandError(error.detail)
@@ -0,0 +1,169 @@
+import io
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from faker import Faker
+from PIL import Image
+
+from TaskRabbit.models import Project, Task
+
+# Titles are drawn from pools of fake values, calling Faker for each of millions of rows
+# would dominate the run time.
+TITLE_POOL_SIZE = 2000
+
+
+def render_image(color, size):
+    """
+    Renders a solid color JPEG, in a worker process when --workers is given.
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (size, size), color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a reproducible dataset of users, projects, members and tasks with batched "
+        "bulk inserts, for load testing. Replaces populate.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks-per-project', type=int, default=20)
+        parser.add_argument('--members-per-project', type=int, default=2)
+        parser.add_argument('--users', type=int, help="Size of the user pool members are drawn from, "
+                                                      "defaults to twice the members per project.")
+        parser.add_argument('--completed-ratio', type=float, default=0.0,
+                            help="Share of the tasks created complete, between 0 and 1.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed making the dataset reproducible.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Projects written per batch.")
+        parser.add_argument('--images', choices=['generate', 'reuse', 'skip'], default='reuse',
+                            help="Render a photo per project, share a small set of photos, or leave them empty.")
+        parser.add_argument('--image-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Processes rendering the photos with --images generate, 0 renders inline.")
+
+    def handle(self, *args, **options):
+        if options['members_per_project'] > (options['users'] or options['members_per_project'] * 2):
+            raise CommandError("--users must be at least --members-per-project.")
+        if not 0 <= options['completed_ratio'] <= 1:
+            raise CommandError("--completed-ratio must be between 0 and 1.")
+
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.fake = Faker()
+        self.fake.seed_instance(options['seed'])
+        self.counts = dict.fromkeys(['users', 'projects', 'members', 'tasks', 'images'], 0)
+        started = time.perf_counter()
+
+        user_ids = self.create_users(options['users'] or options['members_per_project'] * 2)
+        self.project_titles = [self.fake.company() for _ in range(TITLE_POOL_SIZE)]
+        self.task_titles = [self.fake.sentence() for _ in range(TITLE_POOL_SIZE)]
+        self.shared_photos = self.save_shared_photos() if options['images'] == 'reuse' else []
+
+        executor = ProcessPoolExecutor(options['workers']) if options['workers'] and options['images'] == 'generate' else None
+        try:
+            for start in range(0, options['projects'], options['batch_size']):
+                size = min(options['batch_size'], options['projects'] - start)
+                self.create_batch(start, size, user_ids, executor)
+                self.stdout.write(f"  {start + size}/{options['projects']} projects", ending='\r')
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.report(time.perf_counter() - started)
+
+    def create_users(self, count):
+        seed = self.options['seed']
+        usernames = [f'{self.fake.user_name()}.{seed}.{i}' for i in range(count)]
+        User.objects.bulk_create(
+            [User(username=username, email=f'{username}@example.com') for username in usernames],
+            batch_size=self.options['batch_size'], ignore_conflicts=True,
+        )
+        self.counts['users'] = count
+
+        user_ids = []
+        for start in range(0, count, self.options['batch_size']):
+            chunk = usernames[start:start + self.options['batch_size']]
+            user_ids.extend(User.objects.filter(username__in=chunk).values_list('pk', flat=True))
+        return user_ids
+
+    def random_color(self):
+        return tuple(self.random.randint(0, 255) for _ in range(3))
+
+    def save_shared_photos(self, count=16):
+        size = self.options['image_size']
+        names = []
+        for i in range(count):
+            content = ContentFile(render_image(self.random_color(), size))
+            names.append(default_storage.save(f'project_photos/generated_{i}.jpg', content))
+        self.counts['images'] = count
+        return names
+
+    def photos_for(self, start, size, executor):
+        images = self.options['images']
+        if images == 'skip':
+            return [''] * size
+        if images == 'reuse':
+            return [self.random.choice(self.shared_photos) for _ in range(size)]
+
+        colors = [self.random_color() for _ in range(size)]
+        sizes = [self.options['image_size']] * size
+        rendered = executor.map(render_image, colors, sizes, chunksize=32) if executor else map(render_image, colors, sizes)
+        names = [
+            default_storage.save(f'project_photos/generated_{start + i}.jpg', ContentFile(content))
+            for i, content in enumerate(rendered)
+        ]
+        self.counts['images'] += len(names)
+        return names
+
+    def create_batch(self, start, size, user_ids, executor):
+        options = self.options
+        photos = self.photos_for(start, size, executor)
+
+        with transaction.atomic():
+            projects = Project.objects.bulk_create([
+                Project(
+                    title=self.random.choice(self.project_titles),
+                    display_photo=photo,
+                    due_date=self.fake.future_date(end_date='+30d'),
+                )
+                for photo in photos
+            ])
+
+            Membership = Project.members.through
+            Membership.objects.bulk_create([
+                Membership(project_id=project.pk, user_id=user_id)
+                for project in projects
+                for user_id in self.random.sample(user_ids, options['members_per_project'])
+            ], batch_size=5000)
+
+            # TaskQuerySet.bulk_create() sets the task counters of the projects afterwards.
+            Task.objects.bulk_create([
+                Task(
+                    title=self.random.choice(self.task_titles),
+                    project_id=project.pk,
+                    complete=self.random.random() < options['completed_ratio'],
+                )
+                for project in projects
+                for _ in range(options['tasks_per_project'])
+            ], batch_size=5000)
+
+        self.counts['projects'] += size
+        self.counts['members'] += size * options['members_per_project']
+        self.counts['tasks'] += size * options['tasks_per_project']
+
+    def report(self, elapsed):
+        rows = sum(count for name, count in self.counts.items() if name != 'images')
+        self.stdout.write('')
+        for name, count in self.counts.items():
+            self.stdout.write(f"{name:>10}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rows in {elapsed:.2f}s, {rows / elapsed if elapsed else rows:.0f} rows/s."
+        ))
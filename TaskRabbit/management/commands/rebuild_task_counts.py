@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q
+
+from TaskRabbit.models import Project
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the denormalized task counters on projects, or checks them for drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report projects whose counters drifted from the tasks table, and exit non-zero if any did.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(
+            Project.objects.annotate(
+                actual_total=Count('tasks'),
+                actual_completed=Count('tasks', filter=Q(tasks__complete=True)),
+            ).exclude(
+                total_tasks=F('actual_total'), completed_tasks=F('actual_completed'),
+            ).values_list('pk', 'total_tasks', 'completed_tasks', 'actual_total', 'actual_completed')
+        )
+        for pk, total, completed, actual_total, actual_completed in drifted:
+            self.stdout.write(
+                f"Project {pk}: stored {completed}/{total}, actual {actual_completed}/{actual_total}"
+            )
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f"{len(drifted)} project(s) have drifted task counters.")
+            self.stdout.write(self.style.SUCCESS("Task counters are in sync."))
+            return
+
+        updated = Project.objects.refresh_task_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt task counters for {updated} project(s), {len(drifted)} had drifted."
+        ))
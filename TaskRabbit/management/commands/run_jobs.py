@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from TaskRabbit import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs the queued background jobs, such as processing uploaded project photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due instead of polling.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait between polls when idle.")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Seconds after which a running job is considered abandoned and queued again.")
+        parser.add_argument('--requeue-every', type=float, default=60.0,
+                            help="Seconds between two looks for abandoned jobs while polling.")
+        parser.add_argument('--worker', default=None, help="Worker name recorded on claimed jobs.")
+
+    def requeue_stale(self, stale_after):
+        requeued = jobs.requeue_stale(timedelta(seconds=stale_after))
+        if requeued:
+            self.stdout.write(f"Queued {requeued} abandoned job(s) again.")
+
+    def handle(self, *args, **options):
+        worker = options['worker'] or jobs.default_worker_name()
+
+        processed = 0
+        # The jobs of a worker that died are queued again by the workers still polling.
+        next_requeue = time.monotonic()
+        try:
+            while True:
+                if time.monotonic() >= next_requeue:
+                    self.requeue_stale(options['stale_after'])
+                    next_requeue = time.monotonic() + options['requeue_every']
+                job = jobs.claim_next(worker)
+                if job is None:
+                    if options['burst']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                job = jobs.run(job)
+                processed += 1
+                self.stdout.write(f"{job} after {job.attempts} attempt(s)")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
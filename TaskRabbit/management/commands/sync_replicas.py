@@ -0,0 +1,47 @@
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def replica_path(alias):
+    # The replicas are opened with a read-only URI, file:<path>?mode=ro.
+    return urlparse(str(connections[alias].settings_dict['NAME'])).path
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the default SQLite database to the read replicas of DATABASE_REPLICAS with the online "
+        "backup API, once or every --interval seconds, to try the replica routing locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Copy again every INTERVAL seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError("No replicas are configured, set DATABASE_REPLICA_PATHS.")
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Only SQLite replicas can be synced, use the replication of your database.")
+
+        while True:
+            started = time.monotonic()
+            primary = sqlite3.connect(str(connections['default'].settings_dict['NAME']))
+            try:
+                for alias in replicas:
+                    replica = sqlite3.connect(replica_path(alias))
+                    try:
+                        primary.backup(replica)
+                    finally:
+                        replica.close()
+            finally:
+                primary.close()
+            self.stdout.write(f"Synced {len(replicas)} replica(s) in {time.monotonic() - started:.2f}s.")
+
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,146 @@
+"""
+Serving of user uploaded media, replacing `django.conf.urls.static.static()`, which only
+works under DEBUG and sends files without caching headers.
+
+Files are served WhiteNoise style: content-addressed names (a SHA-256 hex digest, like
+processed project photos and their thumbnails) are cached forever, and single byte ranges
+are answered with 206. The media are JPEG and WebP photos, compressed already, so they have
+no compressed variants.
+
+With MEDIA_ACCEL set, the bytes are left to the front server through X-Sendfile or
+X-Accel-Redirect, and the app only checks the path and sets the headers.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+# File names containing a SHA-256 hex digest never change content.
+IMMUTABLE_NAME = re.compile(r'(^|[/_.-])[0-9a-f]{64}([_.]|$)')
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control(path):
+    if IMMUTABLE_NAME.search(path):
+        return 'public, max-age=31536000, immutable'
+    return f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', 3600)}"
+
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) of a single byte range, end included, None to send the whole
+    file, or False when the range cannot be satisfied. Multiple ranges get the whole file.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # The last N bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Whether a Range request applies to the current file, as per its If-Range header.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def accel_headers(response, fullpath, path):
+    """
+    Hands the body over to the front server, as configured by MEDIA_ACCEL: X-Sendfile
+    (Apache, lighttpd) takes the absolute path, X-Accel-Redirect (nginx) the path under an
+    internal location serving MEDIA_ROOT.
+    """
+    accel = getattr(settings, 'MEDIA_ACCEL', '')
+    if accel == 'sendfile':
+        response['X-Sendfile'] = fullpath
+    elif accel == 'accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+    return response
+
+
+def serve_media(request, path):
+    """
+    Serves a file under MEDIA_ROOT.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found.')
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found.')
+
+    stat = os.stat(fullpath)
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+        byte_range = None
+        if 'Range' in request.headers and if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers['Range'], stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif getattr(settings, 'MEDIA_ACCEL', ''):
+            # The front server sends the bytes and answers Range requests itself.
+            response = accel_headers(HttpResponse(content_type=content_type), fullpath, path)
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(open(fullpath, 'rb'), start, end - start + 1), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            # Sent with the server's wsgi.file_wrapper, i.e. sendfile() under gunicorn.
+            response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+            response['Content-Length'] = stat.st_size
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
+    return response
+
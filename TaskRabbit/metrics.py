@@ -0,0 +1,236 @@
+"""
+Per-request instrumentation: database queries, serialization and rendering time, and the
+Prometheus metrics built from them.
+
+InstrumentationMiddleware makes a RequestMetrics the current one for each request. It sees
+every query through a database execute wrapper, and the views and the renderer time their
+serialization with `timed()`. The figures are then sent back in a Server-Timing header,
+logged as JSON by the TaskRabbit.requests logger, and, when METRICS_ENABLED is set, added to
+per-route histograms served at /metrics in the Prometheus text format.
+
+The metrics are kept per process: behind several gunicorn workers, a scrape reads those of
+the worker that answers it.
+"""
+import collections
+import contextvars
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+current = contextvars.ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestMetrics:
+    """
+    What a request spent its time on. Instances are the execute wrapper of the connections
+    used by the request, and record each query.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.query_count = 0
+        self.db_time = 0.0
+        # How many times each statement ran, and each statement with the same parameters.
+        self.statements = collections.Counter()
+        self.executions = collections.Counter()
+        # Time spent in the timed() blocks by name, without their queries.
+        self.timings = {}
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.statements[sql] += 1
+            if not many:
+                self.executions[sql, repr(params)] += 1
+
+    def start_recording(self):
+        """
+        Records the queries of the connections of the current thread, those of the request.
+        """
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+
+    def stop_recording(self):
+        self._stack.close()
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def duplicates(self):
+        """
+        Number of queries that ran before with the same parameters.
+        """
+        return sum(count - 1 for count in self.executions.values())
+
+    def repeated(self):
+        """
+        Returns the statements that ran at least REPEATED_QUERY_LIMIT times, with other
+        parameters or not, the mark of an N+1 pattern.
+        """
+        limit = getattr(settings, 'REPEATED_QUERY_LIMIT', 10)
+        return {sql: count for sql, count in self.statements.most_common() if count >= limit}
+
+    def flags(self):
+        """
+        Returns the thresholds the request went over.
+        """
+        flags = []
+        if self.duration * 1000 >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+            flags.append('slow')
+        if self.query_count > getattr(settings, 'REQUEST_QUERY_LIMIT', 50):
+            flags.append('queries')
+        if self.duplicates >= getattr(settings, 'DUPLICATE_QUERY_LIMIT', 5):
+            flags.append('duplicates')
+        if self.repeated():
+            flags.append('repeated')
+        return flags
+
+    def server_timing(self):
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"']
+        entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.timings.items()]
+        entries.append(f'total;dur={self.duration * 1000:.1f}')
+        return ', '.join(entries)
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration * 1000, 2),
+            'queries': self.query_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'duplicate_queries': self.duplicates,
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.timings.items()},
+            # Truncated, the statements of bulk requests can be long.
+            'repeated_queries': {sql[:200]: count for sql, count in self.repeated().items()},
+        }
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block, less the time of its queries, to the `name` timing of
+    the current request, if any.
+    """
+    metrics = current.get()
+    if metrics is None:
+        yield
+        return
+    db_time = metrics.db_time
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (metrics.db_time - db_time)
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + elapsed
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{format_labels(labels)} {value}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        counts, total, count = self.values.get(labels, ([0] * len(self.buckets), 0.0, 0))
+        counts = [n + (value <= bound) for n, bound in zip(counts, self.buckets)]
+        self.values[labels] = (counts, total + value, count + 1)
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            # Bucket counts are stored cumulative already: a value counts in every bucket above it.
+            for bound, n in zip(self.buckets, counts):
+                yield f'{self.name}_bucket{format_labels(labels + (("le", bound),))} {n}'
+            yield f'{self.name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}'
+            yield f'{self.name}_sum{format_labels(labels)} {total}'
+            yield f'{self.name}_count{format_labels(labels)} {count}'
+
+
+class Registry:
+    """
+    The request metrics of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter('taskrabbit_requests_total', 'Requests by route, method and status.')
+        self.duration = Histogram(
+            'taskrabbit_request_duration_seconds', 'Request latency by route and method.', DURATION_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            'taskrabbit_request_db_seconds', 'Time spent in database queries per request.', DURATION_BUCKETS,
+        )
+        self.queries = Histogram('taskrabbit_request_queries', 'Database queries per request.', QUERY_BUCKETS)
+        self.flagged = Counter(
+            'taskrabbit_flagged_requests_total', 'Requests over a threshold, by route and threshold.',
+        )
+
+    def record(self, route, method, status, metrics, flags):
+        labels = (('route', route), ('method', method))
+        with self._lock:
+            self.requests.inc(labels + (('status', status),))
+            self.duration.observe(labels, metrics.duration)
+            self.db_duration.observe(labels, metrics.db_time)
+            self.queries.observe(labels, metrics.query_count)
+            for flag in flags:
+                self.flagged.inc((('route', route), ('threshold', flag)))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in (self.requests, self.duration, self.db_duration, self.queries, self.flagged):
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """
+    Serves the request metrics of this process in the Prometheus text format, if enabled.
+    """
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
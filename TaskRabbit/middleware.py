@@ -0,0 +1,227 @@
+import gzip
+import json
+import logging
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+from .routers import pinned, replica, wrote
+
+request_logger = logging.getLogger('TaskRabbit.requests')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def accepted_encodings(header):
+    """
+    Returns the encodings accepted by an Accept-Encoding header, without the ones refused
+    with q=0.
+    """
+    accepted = set()
+    for name, quality in ACCEPT_ENCODING.findall(header.lower()):
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name)
+    return accepted
+
+
+# The streams are flushed once this many bytes went in since the last flush, so that a slow
+# export still reaches the client as it goes. Every flush ends a compressed block, flushing
+# small chunks would lose most of the compression.
+FLUSH_SIZE = 64 * 1024
+
+
+def gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= FLUSH_SIZE:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    pending = 0
+    for chunk in chunks:
+        compressed = compressor.process(chunk)
+        pending += len(chunk)
+        if pending >= FLUSH_SIZE:
+            compressed += compressor.flush()
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses with Brotli, when the brotli package is installed and the client
+    accepts it, or gzip.
+
+    Only responses of the content types in COMPRESSION_CONTENT_TYPES are compressed, and,
+    when their length is known, of at least COMPRESSION_MIN_SIZE bytes: below that the
+    compression costs more time than the bytes it saves. Streamed responses such as the
+    exports are compressed chunk by chunk.
+    """
+
+    def select_encoding(self, request):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding') or response.has_header('Content-Range'):
+            return False
+        if response.streaming:
+            # Async iterators are left alone, and so are files, served as they are stored.
+            return not response.is_async and not hasattr(response, 'file_to_stream')
+        return len(response.content) >= getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        if not self.is_compressible(response):
+            return response
+
+        # Whether the response is compressed depends on Accept-Encoding, even when it is not.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.select_encoding(request)
+        if encoding is None:
+            return response
+
+        gzip_level = getattr(settings, 'GZIP_LEVEL', 6)
+        brotli_quality = getattr(settings, 'BROTLI_QUALITY', 5)
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_stream(response.streaming_content, brotli_quality)
+            else:
+                response.streaming_content = gzip_stream(response.streaming_content, gzip_level)
+            # The compressed length is not known in advance.
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=brotli_quality)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=gzip_level, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is another representation of the same content.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Sends the reads of a request to the primary, instead of the read replicas, when it may
+    write, or when the client wrote less than REPLICA_STICKY_SECONDS ago and a replica may not
+    have its write yet. A cookie remembers the last write of the client.
+    """
+    cookie_name = 'pin_primary'
+
+    def process_request(self, request):
+        # Set anew on every request, the values of the previous one are left behind.
+        pinned.set(request.method not in ('GET', 'HEAD', 'OPTIONS') or self.cookie_name in request.COOKIES)
+        wrote.set(False)
+        replica.set(None)
+
+    def process_response(self, request, response):
+        if wrote.get():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Measures every request: its queries, their time and the duplicate ones, the time spent
+    serializing and rendering, and its total latency, see TaskRabbit.metrics.
+
+    The figures are sent back in a Server-Timing header, when SERVER_TIMING is set, and logged
+    as JSON, at the warning level for the requests over one of the thresholds. Streamed
+    responses are measured up to their first byte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current.set(request_metrics)
+        request_metrics.start_recording()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.stop_recording()
+            metrics.current.reset(token)
+        return self.finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current.set(request_metrics)
+        # The queries of async views run in the thread of sync_to_async(), with its connections.
+        await sync_to_async(request_metrics.start_recording)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(request_metrics.stop_recording)()
+            metrics.current.reset(token)
+        return self.finish(request, response, request_metrics)
+
+    def finish(self, request, response, request_metrics):
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        flags = request_metrics.flags()
+
+        if getattr(settings, 'SERVER_TIMING', False):
+            response.headers['Server-Timing'] = request_metrics.server_timing()
+        level = logging.WARNING if flags else logging.INFO
+        # Most requests are below the level logged, don't build their line.
+        if request_logger.isEnabledFor(level):
+            request_logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': route,
+                'status': response.status_code,
+                **request_metrics.as_dict(),
+                'flags': flags,
+            }))
+        if getattr(settings, 'METRICS_ENABLED', False):
+            metrics.registry.record(route, request.method, response.status_code, request_metrics, flags)
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_task_counts(apps, schema_editor):
+    Project = apps.get_model('TaskRabbit', 'Project')
+    Task = apps.get_model('TaskRabbit', 'Task')
+
+    def count(condition):
+        tasks = (Task.objects.filter(condition, project=OuterRef('pk'))
+                 .order_by().values('project').annotate(count=Count('pk')).values('count'))
+        return Coalesce(Subquery(tasks), 0)
+
+    Project.objects.update(total_tasks=count(Q()), completed_tasks=count(Q(complete=True)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskRabbit', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='completed_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='members',
+            field=models.ManyToManyField(blank=True, related_name='projects', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_task_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+# Tables whose titles get a trigram FTS5 index, kept in sync by triggers.
+FTS_TABLES = ('TaskRabbit_project', 'TaskRabbit_task')
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for table in FTS_TABLES:
+        fts = f'{table}_fts'
+        statements = [
+            f"CREATE VIRTUAL TABLE \"{fts}\" USING fts5("
+            f"title, content='{table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER \"{fts}_insert\" AFTER INSERT ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(rowid, title) VALUES (new.id, new.title); END",
+            f"CREATE TRIGGER \"{fts}_delete\" AFTER DELETE ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, title) VALUES ('delete', old.id, old.title); END",
+            f"CREATE TRIGGER \"{fts}_update\" AFTER UPDATE OF title ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, title) VALUES ('delete', old.id, old.title); "
+            f"INSERT INTO \"{fts}\"(rowid, title) VALUES (new.id, new.title); END",
+            f"INSERT INTO \"{fts}\"(\"{fts}\") VALUES ('rebuild')",
+        ]
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                for statement in statements:
+                    schema_editor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer),
+            # search falls back to icontains.
+            return
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for table in FTS_TABLES:
+        fts = f'{table}_fts'
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{trigger}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskRabbit', '0003_task_and_project_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
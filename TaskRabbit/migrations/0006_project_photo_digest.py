@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskRabbit', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='photo_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
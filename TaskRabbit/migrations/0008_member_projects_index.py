@@ -0,0 +1,34 @@
+from django.db import migrations
+
+INDEX = 'project_members_user_project_idx'
+
+
+def table_name(apps):
+    return apps.get_model('TaskRabbit', 'Project').members.through._meta.db_table
+
+
+def create_index(apps, schema_editor):
+    # The auto-created through table has no Meta to declare indexes in. Leading with user_id,
+    # the index covers the ?member= and /users/<id>/ lookups without reading the table rows.
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f'CREATE INDEX {quote(INDEX)} ON {quote(table_name(apps))} ({quote("user_id")}, {quote("project_id")})'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(schema_editor.sql_delete_index % {
+        'table': schema_editor.quote_name(table_name(apps)),
+        'name': schema_editor.quote_name(INDEX),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskRabbit', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
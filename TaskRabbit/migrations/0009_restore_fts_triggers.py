@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Tables whose titles have the trigram FTS5 index of 0004.
+FTS_TABLES = ('TaskRabbit_project', 'TaskRabbit_task')
+
+
+def create_fts_triggers(apps, schema_editor):
+    # SQLite rebuilds a table to alter it, which drops its triggers: 0005 did so for both
+    # tables. Recreate them, and rebuild the indexes that missed the writes made meanwhile.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    tables = set(schema_editor.connection.introspection.table_names())
+    for table in FTS_TABLES:
+        fts = f'{table}_fts'
+        if fts not in tables:
+            # SQLite without FTS5 or trigram support, 0004 created nothing.
+            continue
+        for statement in [
+            f"CREATE TRIGGER IF NOT EXISTS \"{fts}_insert\" AFTER INSERT ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(rowid, title) VALUES (new.id, new.title); END",
+            f"CREATE TRIGGER IF NOT EXISTS \"{fts}_delete\" AFTER DELETE ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, title) VALUES ('delete', old.id, old.title); END",
+            f"CREATE TRIGGER IF NOT EXISTS \"{fts}_update\" AFTER UPDATE OF title ON \"{table}\" BEGIN "
+            f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, title) VALUES ('delete', old.id, old.title); "
+            f"INSERT INTO \"{fts}\"(rowid, title) VALUES (new.id, new.title); END",
+            f"INSERT INTO \"{fts}\"(\"{fts}\") VALUES ('rebuild')",
+        ]:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskRabbit', '0008_member_projects_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -1,28 +1,243 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class ProjectQuerySet(models.QuerySet):
+  def refresh_task_counts(self):
+    """
+    Recomputes the denormalized task counters of the selected projects from the tasks table in one UPDATE.
+    """
+    def count(condition):
+      tasks = (Task.objects.filter(condition, project=OuterRef('pk'))
+               .order_by().values('project').annotate(count=Count('pk')).values('count'))
+      return Coalesce(Subquery(tasks), 0)
+
+    return self.update(
+      total_tasks=count(Q()), completed_tasks=count(Q(complete=True)), updated_at=timezone.now(),
+    )
+
 
 class Project(models.Model):
   title = models.CharField(max_length=255)
   display_photo = models.ImageField(upload_to='project_photos/', blank=True)
+  # SHA-256 of the photo, naming its thumbnails, see TaskRabbit.thumbnails.
+  photo_digest = models.CharField(max_length=64, blank=True, editable=False)
+  # Progress of the background processing of an uploaded photo, see TaskRabbit.jobs.
+  photo_status = models.CharField(max_length=10, blank=True, editable=False, choices=[
+    ('pending', 'Pending'),
+    ('processing', 'Processing'),
+    ('ready', 'Ready'),
+    ('failed', 'Failed'),
+  ])
   date_created = models.DateTimeField(auto_now_add=True)
+  # Also bumped when the task counters or the members change, see TaskRabbit.signals.
+  updated_at = models.DateTimeField(auto_now=True)
   due_date = models.DateField(blank=True, null=True)
   members = models.ManyToManyField('auth.User', related_name='projects', blank=True)
-  
+  # Denormalized task counters, kept in sync by the Task signals in TaskRabbit.signals.
+  total_tasks = models.PositiveIntegerField(default=0, editable=False)
+  completed_tasks = models.PositiveIntegerField(default=0, editable=False)
+
+  objects = ProjectQuerySet.as_manager()
+
+  # Only ever written by UPDATEs computed in the database, see ProjectQuerySet.refresh_task_counts.
+  counter_fields = ('total_tasks', 'completed_tasks')
+
+  class Meta:
+    indexes = [
+      # Keyset pagination of /projects/ orders by (date_created, id).
+      models.Index(fields=['date_created'], name='project_date_created_idx'),
+      models.Index(fields=['due_date'], name='project_due_date_idx'),
+      # Last-Modified of /projects/ is the latest updated_at.
+      models.Index(fields=['updated_at'], name='project_updated_at_idx'),
+    ]
+
+  def save(self, *args, **kwargs):
+    """
+    Leaves the task counters out of the UPDATE of an existing project.
+
+    The values loaded with the project would otherwise overwrite the task changes committed
+    since, editable=False only keeps the counters out of forms and serializers.
+    """
+    if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+      kwargs['update_fields'] = [
+        field.name for field in self._meta.concrete_fields
+        if not field.primary_key and field.name not in self.counter_fields
+      ]
+    super().save(*args, **kwargs)
+
   def is_completed(self):
     """
     Checks if all tasks associated with the project are completed.
 
-    This method assumes a Task model with a 'complete' boolean field and a foreign key relationship to the Project model.
+    Reads the denormalized task counters, so no query is made.
     """
-    return self.tasks.filter(complete=True).count() == self.tasks.count()
+    return self.completed_tasks == self.total_tasks
 
   def __str__(self):
     return self.title
 
+def refresh_projects(project_ids):
+  """
+  Recounts the tasks of the given projects.
+  """
+  project_ids = {pk for pk in project_ids if pk is not None}
+  if project_ids:
+    Project.objects.filter(pk__in=project_ids).refresh_task_counts()
+
+
+class TaskQuerySet(models.QuerySet):
+  """
+  Keeps the project task counters exact through the bulk operations that send no per-task
+  signals, each of them recounting the affected projects once.
+  """
+  counter_fields = {'complete', 'project', 'project_id'}
+
+  def update(self, **kwargs):
+    """
+    Updates the tasks and refreshes the task counters of the projects they belong to.
+
+    QuerySet.update() sends no signals and skips auto_now, so updated_at is set here and the
+    counters are fixed up whenever 'complete' or the project of the tasks changes.
+    """
+    kwargs.setdefault('updated_at', timezone.now())
+    if not self.counter_fields & kwargs.keys():
+      return super().update(**kwargs)
+
+    project_ids = set(self.values_list('project_id', flat=True).distinct())
+    new_project = kwargs.get('project', kwargs.get('project_id'))
+    if new_project is not None:
+      project_ids.add(getattr(new_project, 'pk', new_project))
+    with transaction.atomic(using=self.db):
+      rows = super().update(**kwargs)
+      if rows:
+        refresh_projects(project_ids)
+    return rows
+
+  update.alters_data = True
+
+  def delete(self):
+    """
+    Deletes the tasks, recounting their projects once instead of once per task.
+    """
+    project_ids = set(self.values_list('project_id', flat=True).distinct())
+    # Tells the post_delete counter signal to leave the counters to this method.
+    self._refreshes_task_counts = True
+    with transaction.atomic(using=self.db):
+      deleted = super().delete()
+      refresh_projects(project_ids)
+    return deleted
+
+  delete.alters_data = True
+
+  def bulk_create(self, objs, *args, **kwargs):
+    objs = list(objs)
+    with transaction.atomic(using=self.db):
+      created = super().bulk_create(objs, *args, **kwargs)
+      refresh_projects({obj.project_id for obj in objs})
+    return created
+
+  bulk_create.alters_data = True
+
+  def bulk_update(self, objs, fields, *args, **kwargs):
+    """
+    Updates the given fields of the tasks, setting their updated_at which bulk_update()
+    does not do by itself.
+    """
+    objs, fields = list(objs), set(fields)
+    now = timezone.now()
+    for obj in objs:
+      obj.updated_at = now
+    fields.add('updated_at')
+
+    project_ids = set()
+    if self.counter_fields & fields:
+      project_ids = {obj.project_id for obj in objs}
+      if fields & {'project', 'project_id'}:
+        # The tasks may be moving away from projects that need recounting too.
+        project_ids.update(
+          self.model._base_manager.using(self.db)
+          .filter(pk__in=[obj.pk for obj in objs]).values_list('project_id', flat=True)
+        )
+    with transaction.atomic(using=self.db):
+      rows = super().bulk_update(objs, fields, *args, **kwargs)
+      refresh_projects(project_ids)
+    return rows
+
+  bulk_update.alters_data = True
+
+
 class Task(models.Model):
   title = models.CharField(max_length=255)
   date_created = models.DateTimeField(auto_now_add=True)
+  updated_at = models.DateTimeField(auto_now=True)
   project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
   complete = models.BooleanField(default=False)
 
+  objects = TaskQuerySet.as_manager()
+
+  class Meta:
+    indexes = [
+      # Serves the ?project=&completed= filter of /tasks/ together with its date_created
+      # ordering, and the (project, complete) counts behind the task counters.
+      models.Index(fields=['project', 'complete', 'date_created'], name='task_project_complete_idx'),
+      models.Index(fields=['project', 'date_created'], name='task_project_created_idx'),
+      models.Index(fields=['date_created'], name='task_date_created_idx'),
+      # Last-Modified of /tasks/?project= is the latest updated_at of the project's tasks.
+      models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+    ]
+
+  @classmethod
+  def from_db(cls, db, field_names, values):
+    instance = super().from_db(db, field_names, values)
+    instance._remember_counters()
+    return instance
+
+  def refresh_from_db(self, *args, **kwargs):
+    super().refresh_from_db(*args, **kwargs)
+    self._remember_counters()
+
+  def _remember_counters(self):
+    # Remember the stored state so the counter signals can tell what changed on save.
+    self._loaded_counters = (self.__dict__.get('project_id'), self.__dict__.get('complete'))
+
+  def __str__(self):
+    return self.title
+
+
+class Job(models.Model):
+  """
+  A unit of background work, run by the `run_jobs` worker command, see TaskRabbit.jobs.
+  """
+  QUEUED = 'queued'
+  RUNNING = 'running'
+  DONE = 'done'
+  FAILED = 'failed'
+
+  kind = models.CharField(max_length=100)
+  payload = models.JSONField(default=dict)
+  status = models.CharField(max_length=10, default=QUEUED, choices=[
+    (QUEUED, 'Queued'),
+    (RUNNING, 'Running'),
+    (DONE, 'Done'),
+    (FAILED, 'Failed'),
+  ])
+  attempts = models.PositiveIntegerField(default=0)
+  max_attempts = models.PositiveIntegerField(default=5)
+  run_after = models.DateTimeField(default=timezone.now)
+  locked_by = models.CharField(max_length=100, blank=True)
+  locked_at = models.DateTimeField(blank=True, null=True)
+  last_error = models.TextField(blank=True)
+  date_created = models.DateTimeField(auto_now_add=True)
+  updated_at = models.DateTimeField(auto_now=True)
+
+  class Meta:
+    indexes = [
+      # Workers poll for the next due job of a status.
+      models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+    ]
+
   def __str__(self):
-    return self.title
\ No newline at end of file
+    return f'{self.kind} #{self.pk} ({self.status})'
@@ -0,0 +1,84 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class DateCreatedCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (date_created, id), newest first.
+
+    Each page is fetched with a `date_created < cursor` filter on the indexed column instead
+    of an OFFSET, so deep pages cost the same as the first one. The id tie-breaker keeps the
+    ordering stable for rows created within the same timestamp.
+    """
+    ordering = ('-date_created', '-id')
+    # Search results are paged in relevance order instead, see TaskRabbit.search.
+    search_ordering = ('search_rank', '-date_created', '-id')
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Read the sizes from settings on every request so they can be tuned per deployment.
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 500)
+        return super().get_page_size(request)
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+    # CursorPagination.paginate_queryset(), split around the query so that the async views
+    # load the same pages with aiterator().
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page([row async for row in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def page_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the requested page, and the one following it if any, filtered on
+        the position of the cursor and offset by its offset.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*(o[1:] if o.startswith('-') else f'-{o}' for o in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": position})
+        # One more row tells whether a page follows.
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Keeps the page out of the rows of page_queryset(), and the positions of the pages
+        around it for the next and previous links.
+        """
+        offset, reverse, position = self.cursor or (0, False, None)
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None or offset > 0
+            self.has_previous = following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next = following is not None
+            self.has_previous = position is not None or offset > 0
+            self.next_position, self.previous_position = following, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
@@ -0,0 +1,94 @@
+"""
+Routing of reads to the read replicas of DATABASE_REPLICAS, and of writes to the primary.
+
+Once a request writes, its later reads go to the primary too, so that it reads its writes;
+ReplicaRoutingMiddleware extends that to the next requests of the client for
+REPLICA_STICKY_SECONDS, the time the replicas may lag behind. Replicas that fail a health
+check are left out for REPLICA_HEALTH_INTERVAL seconds, and reads fall back to the primary
+when none is left.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+from .models import Project
+
+logger = logging.getLogger(__name__)
+
+# Whether the reads of the current request or job go to the primary, and whether it wrote.
+pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+wrote = contextvars.ContextVar('wrote_to_primary', default=False)
+# The replica the request reads from, one for all its reads so that they agree with each other.
+replica = contextvars.ContextVar('replica', default=None)
+
+
+def check_health(alias):
+    """
+    Returns whether a replica answers queries on the project table, which an empty or
+    missing copy does not have.
+    """
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {connections[alias].ops.quote_name(Project._meta.db_table)} LIMIT 1')
+        return True
+    except (ConnectionDoesNotExist, DatabaseError) as error:
+        logger.warning('Replica %s is unhealthy, reading from the primary instead: %s', alias, error)
+        if alias in connections:
+            connections[alias].close()
+        return False
+
+
+class PrimaryReplicaRouter:
+    primary = DEFAULT_DB_ALIAS
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # alias: (healthy, monotonic time of the check)
+        self._health = {}
+
+    @property
+    def replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_HEALTH_INTERVAL', 10)
+        healthy, checked_at = self._health.get(alias, (None, 0))
+        if healthy is None or time.monotonic() - checked_at >= interval:
+            healthy = check_health(alias)
+            with self._lock:
+                self._health[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or pinned.get() or connections[self.primary].in_atomic_block:
+            return self.primary
+        alias = replica.get()
+        if alias is None or (alias != self.primary and not self.is_healthy(alias)):
+            healthy = [alias for alias in self.replicas if self.is_healthy(alias)]
+            alias = random.choice(healthy) if healthy else self.primary
+            replica.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        pinned.set(True)
+        wrote.set(True)
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        databases = {self.primary, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, migrated with it.
+        if db in self.replicas:
+            return False
+        return None
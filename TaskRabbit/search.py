@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Tables whose titles have a trigram FTS5 index named "<table>_fts", created by migration 0004.
+FTS_TABLES = ('TaskRabbit_project', 'TaskRabbit_task')
+
+
+def fts_trigger_statements(table):
+    """
+    Returns the CREATE TRIGGER statements keeping the FTS index of `table` in sync with it.
+    """
+    fts = f'{table}_fts'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_insert" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, title) VALUES (new.id, new.title); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_delete" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, title) VALUES (\'delete\', old.id, old.title); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_update" AFTER UPDATE OF title ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, title) VALUES (\'delete\', old.id, old.title); '
+        f'INSERT INTO "{fts}"(rowid, title) VALUES (new.id, new.title); END',
+    ]
+
+
+def restore_fts_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Recreates the FTS triggers dropped when SQLite migrations rebuild the project or task
+    table, and rebuilds the indexes that went out of sync meanwhile. Runs after migrate, as a
+    safety net for later migrations: 0009 restores the triggers dropped by 0005.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+        for table in FTS_TABLES:
+            fts = f'{table}_fts'
+            if fts not in tables or {f'{fts}_insert', f'{fts}_delete', f'{fts}_update'} <= triggers:
+                continue
+            for statement in fts_trigger_statements(table):
+                cursor.execute(statement)
+            cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+class SearchBackend:
+    """
+    Base class of the title search backends.
+
+    search() filters a Project or Task queryset down to the rows whose title matches `term`
+    and annotates them with a `search_rank`, lower ranks being better matches.
+    """
+    def search(self, queryset, term):
+        raise NotImplementedError
+
+
+class IContainsSearchBackend(SearchBackend):
+    """
+    Unranked `title__icontains` search, works on any database but scans the whole table.
+    """
+    def search(self, queryset, term):
+        return queryset.filter(title__icontains=term).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+        )
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """
+    Ranked search through the trigram FTS5 tables that database triggers keep in sync with
+    the project and task titles.
+
+    The trigram tokenizer matches substrings like `icontains` did, but from the FTS index,
+    and results are ranked with bm25(). Terms shorter than a trigram, or databases without
+    the FTS tables, fall back to IContainsSearchBackend.
+    """
+    fallback = IContainsSearchBackend()
+    # (database alias, FTS table) -> whether the table exists, looked up once per process.
+    _available = {}
+
+    def is_available(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'sqlite':
+            return False
+        fts_table = f'{queryset.model._meta.db_table}_fts'
+        key = (connection.alias, fts_table)
+        if key not in self._available:
+            self._available[key] = fts_table in connection.introspection.table_names()
+        return self._available[key]
+
+    @staticmethod
+    def build_match(words):
+        """
+        Builds an FTS5 query matching all the words, each quoted so that FTS5 operators and
+        punctuation in the search term are matched literally.
+        """
+        return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+    def search(self, queryset, term):
+        words = term.split()
+        if not words or min(len(word) for word in words) < 3 or not self.is_available(queryset):
+            return self.fallback.search(queryset, term)
+
+        match = self.build_match(words)
+        table = queryset.model._meta.db_table
+        fts_table = f'{table}_fts'
+        # The FTS table is joined once, its MATCH both filters the rows and feeds bm25().
+        return queryset.extra(
+            tables=[fts_table],
+            where=[f'"{fts_table}".rowid = "{table}"."id"', f'"{fts_table}" MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=RawSQL(f'bm25("{fts_table}")', (), output_field=FloatField()))
+
+
+def get_search_backend():
+    """
+    Returns an instance of the backend named by the SEARCH_BACKEND setting.
+    """
+    return import_string(getattr(settings, 'SEARCH_BACKEND', 'TaskRabbit.search.SQLiteFTSSearchBackend'))()
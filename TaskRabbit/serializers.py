@@ -1,11 +1,28 @@
 from rest_framework import serializers
 from .models import Project, Task
+from .jobs import enqueue
+from django.conf import settings
 from django.contrib.auth.models import User
 
 from datetime import datetime
 
+class SparseFieldsMixin:
+  """
+  Keeps only the fields named by the `fields` argument, see TaskRabbit.fieldsets.
+  Without it, the fields listed in `expandable_fields` are left out.
+  """
+  expandable_fields = ()
+
+  def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(fields) if fields is not None else set(self.fields) - set(self.expandable_fields)
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
 class ProjectSerializer(serializers.ModelSerializer):
   members = serializers.PrimaryKeyRelatedField(many=True, queryset=User.objects.all())
+  # Stored as is, the image is decoded and validated by the process_project_photo job.
+  display_photo = serializers.FileField(required=False, allow_empty_file=False)
 
   class Meta:
     model = Project
@@ -24,9 +41,46 @@ class ProjectSerializer(serializers.ModelSerializer):
             if not title:
                 raise serializers.ValidationError("Title cannot be empty.")
 
+        # Check the photo size, the only check left to the request
+        if data.get('display_photo'):
+            max_size = getattr(settings, 'MAX_PHOTO_UPLOAD_SIZE', 10 * 1024 * 1024)
+            if data['display_photo'].size > max_size:
+                raise serializers.ValidationError(f"Display photo must be at most {max_size} bytes.")
+
         return data
 
-class TaskSerializer(serializers.ModelSerializer):
+  def save(self, **kwargs):
+        # Process a newly uploaded photo in the background
+        photo_changed = 'display_photo' in self.validated_data
+        if photo_changed:
+            kwargs.update(photo_digest='', photo_status='pending' if self.validated_data['display_photo'] else '')
+        instance = super().save(**kwargs)
+        if photo_changed and instance.display_photo:
+            enqueue('process_project_photo', project_id=instance.pk, photo=instance.display_photo.name)
+        return instance
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
   class Meta:
     model = Task
-    fields = '__all__'
\ No newline at end of file
+    fields = '__all__'
+
+class BulkTaskCreateSerializer(serializers.Serializer):
+  """
+  One task of a bulk create. The project is a plain ID, all of them are checked in one query.
+  """
+  title = serializers.CharField(max_length=255)
+  project = serializers.IntegerField(min_value=1)
+  complete = serializers.BooleanField(default=False)
+
+
+class BulkTaskUpdateSerializer(serializers.Serializer):
+  """
+  One task of a bulk update, identified by its ID.
+  """
+  id = serializers.IntegerField(min_value=1)
+  title = serializers.CharField(max_length=255, required=False)
+  complete = serializers.BooleanField(required=False)
+
+
+class BulkTaskDeleteSerializer(serializers.Serializer):
+  ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
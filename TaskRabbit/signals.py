@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Project, Task, refresh_projects
+
+
+def adjust_task_counts(project_id, total=0, completed=0):
+    """
+    Shifts the denormalized task counters of a project with a single F() UPDATE.
+    """
+    if project_id is None or not (total or completed):
+        return
+    Project.objects.filter(pk=project_id).update(
+        total_tasks=F('total_tasks') + total,
+        completed_tasks=F('completed_tasks') + completed,
+        updated_at=timezone.now(),
+    )
+
+
+def touch_projects(*project_ids):
+    """
+    Marks projects as changed for the conditional GET validators and the project cache, when
+    something they embed changed without saving them.
+    """
+    project_ids = [pk for pk in project_ids if pk is not None]
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Task)
+def update_counts_on_task_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    loaded = getattr(instance, '_loaded_counters', None)
+    if created:
+        adjust_task_counts(instance.project_id, total=1, completed=int(instance.complete))
+    elif loaded is None:
+        # The previous state is unknown (instance not loaded from the database), recount instead.
+        refresh_projects([instance.project_id])
+    elif loaded[0] != instance.project_id:
+        old_project_id, old_complete = loaded
+        adjust_task_counts(old_project_id, total=-1, completed=-int(bool(old_complete)))
+        adjust_task_counts(instance.project_id, total=1, completed=int(instance.complete))
+    elif bool(loaded[1]) != instance.complete:
+        adjust_task_counts(instance.project_id, completed=1 if instance.complete else -1)
+
+    instance._remember_counters()
+
+
+@receiver(post_delete, sender=Task)
+def update_counts_on_task_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Project) or (isinstance(origin, QuerySet) and origin.model is Project):
+        # The tasks are being cascaded from their project, which goes away with its counters.
+        return
+    if getattr(origin, '_refreshes_task_counts', False):
+        # TaskQuerySet.delete() recounts the projects once all tasks are gone.
+        return
+
+    loaded = getattr(instance, '_loaded_counters', None)
+    if loaded is None:
+        refresh_projects([instance.project_id])
+    else:
+        adjust_task_counts(loaded[0], total=-1, completed=-int(bool(loaded[1])))
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def touch_project_on_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_projects(instance.pk)
+    elif action == 'pre_clear':
+        # The projects of a user are gone once cleared, remember them for post_clear.
+        instance._cleared_project_ids = list(instance.projects.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        touch_projects(*getattr(instance, '_cleared_project_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        touch_projects(*pk_set)
+
+
+@receiver(post_save, sender=User)
+def touch_projects_of_member(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Projects embed the username and email of their members.
+    if created or raw or (update_fields is not None and not {'username', 'email'} & set(update_fields)):
+        return
+    touch_projects(*instance.projects.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=User)
+def touch_projects_of_deleted_member(sender, instance, **kwargs):
+    # The memberships are deleted with the user by a cascade, which sends no m2m_changed.
+    touch_projects(*instance.projects.values_list('pk', flat=True))
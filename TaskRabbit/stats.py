@@ -0,0 +1,135 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, When
+from django.utils import timezone
+
+from .filters import filter_projects
+from .models import Project
+
+CACHE_PREFIX = 'taskrabbit:stats'
+
+
+def ratio(completed, total):
+    return round(completed / total, 4) if total else None
+
+
+def workload_aggregates(today):
+    """
+    Returns the aggregates of the projects of members, to compute over the members through table.
+    """
+    open_tasks = F('project__total_tasks') - F('project__completed_tasks')
+    return {
+        'projects': Count('project_id'),
+        'total_tasks': Sum('project__total_tasks'),
+        'completed_tasks': Sum('project__completed_tasks'),
+        'open_tasks': Sum(open_tasks),
+        'overdue_tasks': Sum(Case(
+            When(project__due_date__lt=today, then=open_tasks), default=0, output_field=IntegerField(),
+        )),
+    }
+
+
+def project_stats(params):
+    """
+    Returns the dashboard statistics of the projects selected by the project list filters:
+    the global task totals, the STATS_TOP_ROWS projects with the most open tasks, and the
+    workload of as many members, the busiest first.
+
+    A task is overdue when it is not complete and its project is past its due date. The task
+    totals come from the denormalized counters, so the whole dashboard takes three queries, an
+    aggregate and a top-N over the projects and one grouped over their memberships, whatever
+    the number of tasks. The size of the response does not grow with the projects.
+    """
+    today = timezone.localdate()
+    top = getattr(settings, 'STATS_TOP_ROWS', 20)
+    projects = filter_projects(Project.objects.all(), params)
+    open_tasks = F('total_tasks') - F('completed_tasks')
+    overdue = Q(due_date__lt=today)
+
+    # Aliased apart from the counter fields they sum.
+    aggregates = projects.aggregate(
+        projects=Count('id'),
+        overdue_projects=Count('id', filter=overdue & Q(completed_tasks__lt=F('total_tasks'))),
+        all_tasks=Sum('total_tasks'),
+        done_tasks=Sum('completed_tasks'),
+        late_tasks=Sum(Case(When(overdue, then=open_tasks), default=0, output_field=IntegerField())),
+    )
+    # Sums are NULL when no project is selected.
+    totals = {
+        'projects': aggregates['projects'],
+        'overdue_projects': aggregates['overdue_projects'],
+        'total_tasks': aggregates['all_tasks'] or 0,
+        'completed_tasks': aggregates['done_tasks'] or 0,
+        'overdue_tasks': aggregates['late_tasks'] or 0,
+    }
+    totals['completion_ratio'] = ratio(totals['completed_tasks'], totals['total_tasks'])
+
+    rows = list(
+        projects.annotate(open_tasks=open_tasks)
+        .order_by('-open_tasks', '-date_created', '-id')
+        .values('id', 'title', 'due_date', 'total_tasks', 'completed_tasks')[:top]
+    )
+    for row in rows:
+        is_overdue = row['due_date'] is not None and row['due_date'] < today
+        row['overdue_tasks'] = row['total_tasks'] - row['completed_tasks'] if is_overdue else 0
+        row['completion_ratio'] = ratio(row['completed_tasks'], row['total_tasks'])
+
+    members = list(
+        Project.members.through.objects.filter(project__in=projects)
+        .values('user_id', 'user__username')
+        .annotate(**workload_aggregates(today))
+        .order_by('-open_tasks', 'user_id')[:top]
+    )
+
+    return {
+        'totals': totals,
+        'projects': rows,
+        'members': [
+            {
+                'id': member['user_id'],
+                'username': member['user__username'],
+                'projects': member['projects'],
+                'total_tasks': member['total_tasks'],
+                'completed_tasks': member['completed_tasks'],
+                'open_tasks': member['open_tasks'],
+                'overdue_tasks': member['overdue_tasks'],
+            }
+            for member in members
+        ],
+        'generated_at': timezone.now(),
+    }
+
+
+def user_summary(user_id):
+    """
+    Returns the project and task counts of a member, in one aggregate over the members through
+    table, whatever the number of projects.
+    """
+    today = timezone.localdate()
+    summary = Project.members.through.objects.filter(user_id=user_id).aggregate(
+        **workload_aggregates(today),
+        overdue_projects=Count('project_id', filter=Q(
+            project__due_date__lt=today, project__completed_tasks__lt=F('project__total_tasks'),
+        )),
+    )
+    # Sums are NULL for users in no project.
+    summary = {name: value or 0 for name, value in summary.items()}
+    summary['completion_ratio'] = ratio(summary['completed_tasks'], summary['total_tasks'])
+    return summary
+
+
+def cached_project_stats(params):
+    """
+    Returns project_stats(params), cached for STATS_CACHE_TTL seconds per query string.
+
+    The statistics are not invalidated on writes, a dashboard can be a few seconds stale.
+    """
+    cache = caches[getattr(settings, 'PROJECT_CACHE_ALIAS', 'default')]
+    key = f'{CACHE_PREFIX}:{hashlib.md5(repr(sorted(params.lists())).encode()).hexdigest()}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = project_stats(params)
+        cache.set(key, stats, timeout=getattr(settings, 'STATS_CACHE_TTL', 30))
+    return stats
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from benchmarks import regression
+
+from . import jobs, middleware
+from .cache import project_cache
+from .database import retry_on_locked
+from .export import export_queryset, iter_export
+from .metrics import RequestMetrics
+from .routers import PrimaryReplicaRouter, check_health, pinned, replica, wrote
+from .lean import lean_projects, lean_tasks
+from .models import Job, Project, Task
+from .renderers import FastJSONParser, FastJSONRenderer
+from .serializers import TaskSerializer
+from .views import ProjectDetailSerializer, ProjectViewSet, TaskViewSet
+
+
+def jpeg(size=(300, 200), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def create_projects(count, tasks_per_project=3, members_per_project=2):
+    """
+    Creates `count` projects, each with a few members and tasks, the first task completed.
+    """
+    projects = []
+    for i in range(count):
+        project = Project.objects.create(title=f'Project {i}')
+        for j in range(members_per_project):
+            user, _ = User.objects.get_or_create(username=f'user-{j}', email=f'user-{j}@example.com')
+            project.members.add(user)
+        for j in range(tasks_per_project):
+            Task.objects.create(title=f'Task {j}', project=project, complete=(j == 0))
+        projects.append(project)
+    return projects
+
+
+class TaskRabbitTestCase(APITestCase):
+    def setUp(self):
+        # Primary keys are reused between tests, don't let cached projects leak across them.
+        cache.clear()
+
+
+class ProjectQueryCountTests(TaskRabbitTestCase):
+    def test_list_query_count_is_constant(self):
+        create_projects(2)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 2)
+
+        create_projects(10)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_retrieve_query_count_is_constant(self):
+        project = create_projects(1, tasks_per_project=20, members_per_project=5)[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('project-detail', args=[project.pk]))
+        self.assertEqual(response.data['task_counts'], {'total_tasks': 20, 'completed_tasks': 1})
+        self.assertEqual(len(response.data['members']), 5)
+
+    def test_completed_filter(self):
+        done, partial, untouched = create_projects(3, tasks_per_project=2)
+        done.tasks.update(complete=True)
+        untouched.tasks.update(complete=False)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('project-list'), {'completed': 'true'})
+        self.assertEqual([p['id'] for p in response.data['results']], [done.pk])
+
+        response = self.client.get(reverse('project-list'), {'completed': 'false'})
+        self.assertEqual([p['id'] for p in response.data['results']], [partial.pk])
+
+
+class EndpointQueryCountTests(TaskRabbitTestCase):
+    """
+    Catches the N+1 queries of any endpoint, see benchmarks/regression.py.
+    """
+
+    def test_every_router_endpoint_is_covered(self):
+        covered = {(name, method) for name, method, *_ in regression.ENDPOINTS}
+        self.assertEqual(regression.router_endpoints() - covered, set())
+
+    def test_query_counts_do_not_grow_with_the_data(self):
+        regression.seed(10)
+        small = regression.measure(self.client)
+        regression.seed(990, seed=1)
+        large = regression.measure(self.client)
+
+        grown = {label: (small[label][0], queries) for label, (queries, *_) in large.items() if queries > small[label][0]}
+        self.assertEqual(grown, {}, 'Query counts (10 rows, 1000 rows) that grew with the data.')
+
+
+class TaskCounterTests(TaskRabbitTestCase):
+    def assertCounts(self, project, total, completed):
+        project.refresh_from_db()
+        self.assertEqual((project.total_tasks, project.completed_tasks), (total, completed))
+
+    def test_counters_follow_task_writes(self):
+        project, other = create_projects(2, tasks_per_project=0)
+        task = Task.objects.create(title='Task', project=project)
+        Task.objects.create(title='Done', project=project, complete=True)
+        self.assertCounts(project, 2, 1)
+
+        self.client.put(reverse('task-detail', args=[task.pk]), {'title': 'Task', 'project': project.pk, 'complete': True})
+        self.assertCounts(project, 2, 2)
+        self.assertTrue(project.is_completed())
+
+        task.refresh_from_db()
+        task.project = other
+        task.save()
+        self.assertCounts(project, 1, 1)
+        self.assertCounts(other, 1, 1)
+
+        self.client.delete(reverse('task-detail', args=[task.pk]))
+        self.assertCounts(other, 0, 0)
+
+        project.tasks.update(complete=False)
+        self.assertCounts(project, 1, 0)
+
+    def test_task_creation_counts(self):
+        project = create_projects(1, tasks_per_project=0)[0]
+        response = self.client.post(reverse('task-list'), {'title': 'Task', 'project': project.pk, 'complete': True})
+        self.assertEqual(response.status_code, 201)
+        self.assertCounts(project, 1, 1)
+
+    def test_task_creation_response(self):
+        # TaskViewSet.create() builds its own response, with the success headers of DRF.
+        project = create_projects(1, tasks_per_project=0)[0]
+        response = self.client.post(reverse('task-list'), {'title': 'Task', 'project': project.pk})
+        self.assertEqual(response.status_code, 201)
+        task = Task.objects.get(pk=response.data['id'])
+        self.assertEqual((response.data['title'], response.data['project']), ('Task', project.pk))
+        self.assertEqual(task.project, project)
+        self.assertNotIn('Location', response)
+
+        response = self.client.post(reverse('task-list'), {'title': 'Task', 'project': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_saving_a_project_keeps_the_task_changes_made_since_it_was_loaded(self):
+        project = create_projects(1)[0]
+        loaded = Project.objects.get(pk=project.pk)
+        Task.objects.create(title='Task', project=project, complete=True)
+
+        loaded.title = 'Renamed'
+        loaded.save()
+        self.assertCounts(project, 4, 2)
+
+        view = ProjectViewSet.as_view({'patch': 'partial_update'})
+        with mock.patch.object(ProjectViewSet, 'get_object', return_value=Project.objects.get(pk=project.pk)):
+            Task.objects.create(title='Task', project=project)
+            request = APIRequestFactory().patch('/', {'title': 'Patched'}, format='json')
+            self.assertEqual(view(request, pk=project.pk).status_code, 200)
+        self.assertCounts(project, 5, 2)
+        self.assertEqual(project.title, 'Patched')
+
+    def test_rebuild_task_counts_command(self):
+        project = create_projects(1)[0]
+        Project.objects.filter(pk=project.pk).update(total_tasks=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_counts', '--check', stdout=StringIO())
+
+        call_command('rebuild_task_counts', stdout=StringIO())
+        self.assertCounts(project, 3, 1)
+        call_command('rebuild_task_counts', '--check', stdout=StringIO())
+
+
+class PaginationTests(TaskRabbitTestCase):
+    def test_tasks_are_cursor_paginated_newest_first(self):
+        project = create_projects(1, tasks_per_project=0)[0]
+        tasks = [Task.objects.create(title=f'Task {i}', project=project) for i in range(5)]
+
+        response = self.client.get(reverse('task-list'), {'page_size': 2})
+        seen = [t['id'] for t in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [t['id'] for t in response.data['results']]
+        self.assertEqual(seen, [t.pk for t in reversed(tasks)])
+
+    def test_page_size_is_capped(self):
+        create_projects(3, tasks_per_project=0)
+        with self.settings(MAX_PAGE_SIZE=2):
+            response = self.client.get(reverse('project-list'), {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class SearchTests(TaskRabbitTestCase):
+    def search(self, term, url='project-list'):
+        response = self.client.get(reverse(url), {'search': term})
+        return [item['title'] for item in response.data['results']]
+
+    def test_project_search_is_ranked_and_follows_writes(self):
+        Project.objects.create(title='Garden shed')
+        Project.objects.create(title='Shed')
+        project = Project.objects.create(title='Kitchen')
+        self.assertEqual(self.search('shed'), ['Shed', 'Garden shed'])
+
+        project.title = 'Kitchen shed'
+        project.save()
+        self.assertIn('Kitchen shed', self.search('shed'))
+        project.delete()
+        self.assertNotIn('Kitchen shed', self.search('shed'))
+
+    def test_short_and_quoted_terms(self):
+        Project.objects.create(title='Go "fast" AND win')
+        self.assertEqual(self.search('go'), ['Go "fast" AND win'])
+        self.assertEqual(self.search('"fast" AND'), ['Go "fast" AND win'])
+        self.assertEqual(self.search('NOT'), [])
+
+    def test_task_search(self):
+        project = create_projects(1, tasks_per_project=0)[0]
+        Task.objects.create(title='Paint the fence', project=project)
+        Task.objects.create(title='Mow the lawn', project=project)
+        self.assertEqual(self.search('fence', url='task-list'), ['Paint the fence'])
+
+
+class ProjectCacheTests(TaskRabbitTestCase):
+    def get_project(self, project):
+        return self.client.get(reverse('project-detail', args=[project.pk])).data
+
+    def test_cached_reads_skip_serialization_queries(self):
+        create_projects(3)
+        before = self.client.get(reverse('project-cache-stats')).data
+        self.client.get(reverse('project-list'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 3)
+
+        after = self.client.get(reverse('project-cache-stats')).data
+        self.assertEqual(after['misses'] - before['misses'], 3)
+        self.assertEqual(after['hits'] - before['hits'], 3)
+
+    def test_task_and_member_writes_are_not_served_stale(self):
+        project = create_projects(1)[0]
+        self.assertEqual(self.get_project(project)['task_counts']['total_tasks'], 3)
+
+        task = Task.objects.create(title='New', project=project)
+        self.assertEqual(self.get_project(project)['task_counts']['total_tasks'], 4)
+        self.client.delete(reverse('task-detail', args=[task.pk]))
+        self.assertEqual(self.get_project(project)['task_counts']['total_tasks'], 3)
+        project.tasks.update(complete=True)
+        self.assertEqual(self.get_project(project)['task_counts']['completed_tasks'], 3)
+
+        user = User.objects.create(username='newcomer')
+        user.projects.add(project)
+        self.assertIn('newcomer', [m['username'] for m in self.get_project(project)['members']])
+        user.username = 'renamed'
+        user.save()
+        self.assertIn('renamed', [m['username'] for m in self.get_project(project)['members']])
+        project.members.clear()
+        self.assertEqual(self.get_project(project)['members'], [])
+
+    def test_writes_of_other_processes_are_not_served_stale(self):
+        # Like the run_jobs worker, an UPDATE that sends no signal to this process.
+        project = create_projects(1)[0]
+        self.get_project(project)
+        Project.objects.filter(pk=project.pk).update(photo_status='ready', updated_at=timezone.now())
+        self.assertEqual(self.get_project(project)['photo_status'], 'ready')
+
+    def test_rows_loaded_before_a_write_keep_their_version(self):
+        project = create_projects(1)[0]
+        loaded = list(Project.objects.filter(pk=project.pk).values('id', 'updated_at', 'total_tasks'))
+        Task.objects.create(title='New', project=project)
+
+        # A request that loaded its row before the write caches it under the old version.
+        render = lambda rows: [{'total_tasks': row['total_tasks']} for row in rows]
+        self.assertEqual(project_cache.get_many(loaded, 'test', render), [{'total_tasks': 3}])
+        self.assertEqual(self.get_project(project)['task_counts']['total_tasks'], 4)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaCacheTests(TransactionTestCase):
+    """
+    The router reads from the primary inside the transaction of TestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        db_for_read = PrimaryReplicaRouter.db_for_read
+
+        def mirror_read(router, model, **hints):
+            # The replica mirrors the test database, like the TEST MIRROR of its settings.
+            alias = db_for_read(router, model, **hints)
+            return router.primary if alias in router.replicas else alias
+
+        for patch in [
+            mock.patch('TaskRabbit.routers.check_health', return_value=True),
+            mock.patch.object(PrimaryReplicaRouter, 'db_for_read', mirror_read),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_only_primary_reads_fill_the_cache(self):
+        project = create_projects(1)[0]
+        url = reverse('project-detail', args=[project.pk])
+        writer, reader = APIClient(), APIClient()
+        writer.patch(url, {'title': 'Renamed'})
+
+        misses = project_cache.misses
+        self.assertEqual(reader.get(url).data['title'], 'Renamed')
+        reader.get(url)
+        # Read through the replica, twice rendered and never cached.
+        self.assertEqual(project_cache.misses - misses, 2)
+
+        # The writer reads from the primary for REPLICA_STICKY_SECONDS, and caches.
+        self.assertEqual(writer.get(url).data['title'], 'Renamed')
+        hits = project_cache.hits
+        reader.get(url)
+        self.assertEqual(project_cache.hits - hits, 1)
+        self.assertEqual(project_cache.misses - misses, 3)
+
+
+class ConditionalGetTests(TaskRabbitTestCase):
+    def assertNotModified(self, url, response, **params):
+        with self.assertNumQueries(1):
+            repeated = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(repeated['ETag'], response['ETag'])
+
+    def test_project_detail_and_list(self):
+        project = create_projects(1)[0]
+        url = reverse('project-detail', args=[project.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertNotModified(url, response)
+
+        Task.objects.create(title='New', project=project)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+        url = reverse('project-list')
+        response = self.client.get(url)
+        self.assertNotModified(url, response)
+        project.members.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_deleted_member(self):
+        project = create_projects(1)[0]
+        url = reverse('project-detail', args=[project.pk])
+        response = self.client.get(url)
+        User.objects.get(username='user-0').delete()
+
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([member['username'] for member in changed.data['members']], ['user-1'])
+
+    def test_task_list_by_project(self):
+        project = create_projects(1)[0]
+        url = reverse('task-list')
+        response = self.client.get(url, {'project': project.pk})
+        self.assertNotModified(url, response, project=project.pk)
+
+        project.tasks.update(title='Renamed')
+        changed = self.client.get(url, {'project': project.pk}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class BulkTaskTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project, self.other = create_projects(2, tasks_per_project=0)
+        self.url = reverse('task-bulk')
+
+    def assertCounts(self, project, total, completed):
+        project.refresh_from_db()
+        self.assertEqual((project.total_tasks, project.completed_tasks), (total, completed))
+
+    def test_bulk_create(self):
+        tasks = [{'title': f'Task {i}', 'project': self.project.pk, 'complete': i < 10} for i in range(100)]
+        tasks.append({'title': 'Other', 'project': self.other.pk})
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, tasks, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 101)
+        self.assertCounts(self.project, 100, 10)
+        self.assertCounts(self.other, 1, 0)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        response = self.client.post(self.url, [
+            {'title': 'Fine', 'project': self.project.pk},
+            {'title': 'Orphan', 'project': 999999},
+            {'project': self.project.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('project', errors[1])
+        self.assertIn('title', errors[2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update_and_delete(self):
+        tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(5)]
+        response = self.client.patch(
+            self.url, [{'id': task.pk, 'complete': True} for task in tasks[:3]], format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCounts(self.project, 5, 3)
+
+        response = self.client.patch(self.url, [{'id': 999999, 'complete': True}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data['errors'][0])
+
+        response = self.client.delete(self.url, {'ids': [999999, tasks[0].pk]}, format='json')
+        self.assertEqual(response.data['missing'], [999999])
+        with self.assertNumQueries(9):
+            response = self.client.delete(self.url, {'ids': [task.pk for task in tasks[:4]]}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertCounts(self.project, 1, 0)
+
+
+class ExportTests(TaskRabbitTestCase):
+    def export(self, url, **params):
+        response = self.client.get(reverse(url), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_task_export_formats_and_filters(self):
+        project, other = create_projects(2)
+        lines = self.export('task-export', project=project.pk, completed='true').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['project_id'] for row in rows], [project.pk])
+        self.assertEqual(rows[0]['project_title'], project.title)
+
+        lines = self.export('task-export', export_format='csv').splitlines()
+        self.assertEqual(lines[0].split(','), ['id', 'title', 'project_id', 'project_title', 'complete',
+                                               'date_created', 'updated_at'])
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(self.export('task-export', created_after='2999-01-01'), '')
+
+    def test_project_export_and_command(self):
+        create_projects(3)
+        self.assertEqual(len(self.export('project-export').splitlines()), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.csv')
+            call_command('export_data', 'tasks', '--format', 'csv', '--completed', 'false', '--output', path)
+            with open(path) as output:
+                self.assertEqual(len(output.read().splitlines()), 7)
+
+        self.assertEqual(self.client.get(reverse('task-export'), {'export_format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('task-export'), {'created_after': 'soon'}).status_code, 400)
+
+
+class ThumbnailTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_SIZES=(64, 256))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, content, name='photo.jpg'):
+        response = self.client.post(reverse('project-list'), {
+            'title': 'Photo', 'members': [],
+            'display_photo': SimpleUploadedFile(name, content, content_type='image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['photo_status'], 'pending')
+        call_command('run_jobs', '--burst', stdout=StringIO())
+        return Project.objects.get(pk=response.data['id'])
+
+    def test_upload_is_processed_in_the_background(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), color=(200, 30, 30)).save(buffer, format='JPEG', exif=exif)
+        project = self.upload(buffer.getvalue())
+        self.assertEqual(project.photo_status, 'ready')
+        self.assertEqual(len(project.photo_digest), 64)
+        self.assertEqual(project.display_photo.name, f'project_photos/{project.photo_digest[:2]}/{project.photo_digest}.jpg')
+        self.assertNotIn('photo.jpg', os.listdir(os.path.join(self.media_root, 'project_photos')))
+        with Image.open(project.display_photo.path) as image:
+            self.assertEqual(dict(image.getexif()), {})
+
+        thumbnails = self.client.get(reverse('project-detail', args=[project.pk])).data['thumbnails']
+        self.assertEqual(set(thumbnails), {'64', '256'})
+        path = os.path.join(self.media_root, thumbnails['64']['webp'].split('/media/')[1])
+        with Image.open(path) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (64, 43)))
+
+    def test_invalid_upload_fails_without_retry(self):
+        project = self.upload(b'not an image')
+        self.assertEqual(project.photo_status, 'failed')
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+
+    def test_backfill_command(self):
+        photo = os.path.join(self.media_root, 'project_photos', 'old.jpg')
+        os.makedirs(os.path.dirname(photo))
+        with open(photo, 'wb') as f:
+            f.write(jpeg())
+        projects = [Project.objects.create(title=f'Old {i}', display_photo='project_photos/old.jpg') for i in range(2)]
+
+        call_command('build_thumbnails', '--workers', '1', stdout=StringIO())
+        digests = {project.photo_digest for project in Project.objects.filter(pk__in=[p.pk for p in projects])}
+        self.assertEqual(len(digests), 1)
+        self.assertEqual(len(digests.pop()), 64)
+
+
+class JobTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.done = []
+        patch = mock.patch.dict(jobs.handlers, {
+            'noop': (lambda **payload: self.done.append(payload), None),
+            'broken': (mock.Mock(side_effect=jobs.PermanentJobError('No.')), mock.Mock(side_effect=OSError('Gone.'))),
+        })
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_failing_on_failure_still_fails_the_job(self):
+        job = jobs.enqueue('broken', project_id=1)
+        with self.assertLogs('TaskRabbit.jobs', 'ERROR'):
+            job = jobs.claim_and_run(job.pk, worker='test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.FAILED, ''))
+        self.assertIn('OSError: Gone.', job.last_error)
+
+    def test_polling_worker_requeues_abandoned_jobs(self):
+        def sleep(seconds):
+            if not Job.objects.exists():
+                # A worker claims a job, then dies.
+                job = jobs.enqueue('noop', n=1)
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.RUNNING, locked_by='dead', locked_at=timezone.now() - timedelta(hours=1),
+                )
+            else:
+                raise KeyboardInterrupt
+
+        stdout = StringIO()
+        with mock.patch('TaskRabbit.management.commands.run_jobs.time.sleep', side_effect=sleep):
+            call_command('run_jobs', '--requeue-every', '0', stdout=stdout)
+        self.assertIn('Queued 1 abandoned job(s) again.', stdout.getvalue())
+        self.assertEqual(self.done, [{'n': 1}])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+
+class MediaServingTests(TaskRabbitTestCase):
+    digest = 'ab' * 32
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.content = bytes(range(256)) * 4
+        self.write(f'project_photos/ab/{self.digest}.jpg', self.content)
+        self.url = f'/media/project_photos/ab/{self.digest}.jpg'
+
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def test_content_addressed_files_are_immutable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.write('project_photos/photo.jpg', self.content)
+        response = self.client.get('/media/project_photos/photo.jpg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-4:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+        # A stale If-Range gets the whole file.
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_ACCEL='accel-redirect')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/project_photos/ab/{self.digest}.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_outside_media_root(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/project_photos/missing.jpg').status_code, 404)
+
+
+class AsyncReadTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = create_projects(3)
+
+    async def test_project_list_matches_sync_endpoint(self):
+        response = await self.async_client.get(reverse('async-project-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('count', data)
+        self.assertIsNone(data['previous'])
+
+        sync = await sync_to_async(self.client.get)(reverse('project-list'))
+        self.assertEqual(data['results'], json.loads(json.dumps(sync.data['results'][:2])))
+
+        response = await self.async_client.get(data['next'])
+        data = response.json()
+        self.assertEqual(data['results'], json.loads(json.dumps(sync.data['results'][2:])))
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    async def test_project_list_uses_the_cache_and_validators(self):
+        url = reverse('async-project-list')
+        response = await self.async_client.get(url, {'fields': 'id,title'})
+        self.assertEqual([set(row) for row in response.json()['results']], [{'id', 'title'}] * 3)
+
+        before = project_cache.hits
+        response = await self.async_client.get(url, {'fields': 'id,title'})
+        self.assertEqual(project_cache.hits - before, 3)
+
+        response = await self.async_client.get(url, {'fields': 'id,title'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(url, {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_project_list_filters(self):
+        response = await self.async_client.get(reverse('async-project-list'), {'completed': 'true'})
+        self.assertEqual(response.json()['results'], [])
+        response = await self.async_client.get(reverse('async-project-list'), {'search': 'Project 1'})
+        self.assertEqual([row['title'] for row in response.json()['results']], ['Project 1'])
+        response = await self.async_client.get(reverse('async-task-list'), {'completed': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get(reverse('async-task-list'), {'cursor': 'bz1h'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_task_list_and_details(self):
+        project = self.projects[0]
+        response = await self.async_client.get(reverse('async-task-list'), {'project': project.pk, 'page_size': 2})
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        response = await self.async_client.get(data['next'])
+        self.assertEqual(len(response.json()['results']), 1)
+
+        task = await Task.objects.filter(project=project).afirst()
+        response = await self.async_client.get(reverse('async-task-detail', args=[task.pk]), {'fields': 'title'})
+        self.assertEqual(response.json(), {'title': task.title})
+        response = await self.async_client.get(
+            reverse('async-task-detail', args=[task.pk]), {'fields': 'title'}, headers={'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.get(reverse('async-project-detail', args=[project.pk]))
+        self.assertEqual(response.json()['task_counts'], {'total_tasks': 3, 'completed_tasks': 1})
+        response = await self.async_client.get(reverse('async-project-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class StatsTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = create_projects(2)
+        late, on_time = self.projects
+        Project.objects.filter(pk=late.pk).update(due_date=date.today() - timedelta(days=1))
+        Project.objects.filter(pk=on_time.pk).update(due_date=date.today() + timedelta(days=1))
+        other = User.objects.create(username='other', email='other@example.com')
+        on_time.members.add(other)
+
+    def test_stats(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('project-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals'], {
+            'projects': 2, 'overdue_projects': 1, 'total_tasks': 6, 'completed_tasks': 2,
+            'overdue_tasks': 2, 'completion_ratio': 0.3333,
+        })
+        late = next(row for row in response.data['projects'] if row['id'] == self.projects[0].pk)
+        self.assertEqual((late['overdue_tasks'], late['completion_ratio']), (2, 0.3333))
+
+        members = {member['username']: member for member in response.data['members']}
+        self.assertEqual(members['user-0']['projects'], 2)
+        self.assertEqual((members['user-0']['open_tasks'], members['user-0']['overdue_tasks']), (4, 2))
+        self.assertEqual((members['other']['open_tasks'], members['other']['overdue_tasks']), (2, 0))
+
+    def test_cached_and_windowed(self):
+        self.client.get(reverse('project-stats'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('project-stats'))
+
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('project-stats'), {'created_after': tomorrow})
+        self.assertEqual(response.data['totals']['projects'], 0)
+        self.assertIsNone(response.data['totals']['completion_ratio'])
+        self.assertEqual(response.data['members'], [])
+
+        response = self.client.get(reverse('project-stats'), {'created_after': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(STATS_TOP_ROWS=1)
+    def test_rows_are_capped(self):
+        late, on_time = self.projects
+        Task.objects.create(title='Open', project=on_time)
+        response = self.client.get(reverse('project-stats'))
+        self.assertEqual(response.data['totals']['projects'], 2)
+        self.assertEqual([row['id'] for row in response.data['projects']], [on_time.pk])
+        self.assertEqual([member['username'] for member in response.data['members']], ['user-0'])
+
+
+class MemberTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        create_projects(3, members_per_project=1)
+        self.user = User.objects.create(username='member', email='member@example.com')
+        self.mine = create_projects(2, members_per_project=0)
+        for project in self.mine:
+            project.members.add(self.user)
+        Project.objects.filter(pk=self.mine[0].pk).update(due_date=date.today() - timedelta(days=1))
+
+    def test_member_filter(self):
+        response = self.client.get(reverse('project-list'), {'member': self.user.pk})
+        self.assertEqual({row['id'] for row in response.data['results']}, {project.pk for project in self.mine})
+        response = self.client.get(reverse('task-list'), {'member': self.user.pk})
+        self.assertEqual(len(response.data['results']), 6)
+        response = self.client.get(reverse('project-list'), {'member': 'me'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_projects(self):
+        url = reverse('user-projects', args=[self.user.pk])
+        # The user, a page of projects, and the members of the projects not cached yet.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual([row['id'] for row in response.data['results']], [project.pk for project in reversed(self.mine)])
+
+        for project in create_projects(5, members_per_project=0):
+            project.members.add(self.user)
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        self.assertEqual(self.client.get(reverse('user-projects', args=[0])).status_code, 404)
+
+    def test_user_summary(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user-summary', args=[self.user.pk]))
+        self.assertEqual(response.data, {
+            'id': self.user.pk, 'username': 'member', 'projects': 2, 'total_tasks': 6, 'completed_tasks': 2,
+            'open_tasks': 4, 'overdue_tasks': 2, 'overdue_projects': 1, 'completion_ratio': 0.3333,
+        })
+
+        loner = User.objects.create(username='loner', email='loner@example.com')
+        response = self.client.get(reverse('user-summary', args=[loner.pk]))
+        self.assertEqual((response.data['projects'], response.data['completion_ratio']), (0, None))
+
+
+class FieldsetTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = create_projects(1)[0]
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('project-list'), {'fields': 'id,title,task_counts'})
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'title', 'task_counts'})
+        self.assertEqual(row['task_counts'], {'total_tasks': 3, 'completed_tasks': 1})
+
+        response = self.client.get(reverse('task-list'), {'fields': 'id,complete'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'complete'})
+
+        response = self.client.get(reverse('project-list'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('project-list'), {'expand': 'title'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_default_fields_are_unchanged(self):
+        row = self.client.get(reverse('project-list')).data['results'][0]
+        self.assertNotIn('tasks', row)
+        self.assertEqual(len(row['members']), 2)
+
+    def test_expand(self):
+        # The project, the count and last update of its tasks, its members and its tasks.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('project-detail', args=[self.project.pk]), {
+                'fields': 'id', 'expand': 'members,tasks',
+            })
+        self.assertEqual(set(response.data), {'id', 'members', 'tasks'})
+        self.assertEqual(len(response.data['tasks']), 3)
+
+        # The validators are checked before the tasks are loaded.
+        etag = response['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('project-detail', args=[self.project.pk]), {'fields': 'id', 'expand': 'members,tasks'},
+                HTTP_IF_NONE_MATCH=etag,
+            )
+        self.assertEqual(response.status_code, 304)
+
+        # A page of projects does not embed their tasks.
+        for url in (reverse('project-list'), reverse('async-project-list')):
+            self.assertEqual(self.client.get(url, {'expand': 'tasks'}).status_code, 400)
+
+        # Embedded tasks are not cached and their edits change the ETag.
+        task = self.project.tasks.first()
+        task.title = 'Renamed'
+        task.save()
+        response = self.client.get(
+            reverse('project-detail', args=[self.project.pk]), {'fields': 'id', 'expand': 'members,tasks'},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', [row['title'] for row in response.data['tasks']])
+
+
+class LeanSerializationTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        create_projects(3)
+        Project.objects.filter(title='Project 1').update(
+            due_date=date.today(), display_photo='project_photos/photo.jpg', photo_digest='ab' * 32,
+        )
+
+    def test_tasks_match_serializer(self):
+        fields = TaskViewSet.field_columns.keys() | {'id', 'date_created', 'updated_at'}
+        rows = list(Task.objects.order_by('id').values(*fields))
+        expected = TaskSerializer(Task.objects.order_by('id'), many=True).data
+        self.assertEqual(lean_tasks(rows, fields), expected)
+        self.assertEqual(lean_tasks(rows, {'id', 'complete'}), [{'id': task['id'], 'complete': task['complete']} for task in expected])
+
+    def test_projects_match_serializer(self):
+        request = APIRequestFactory().get('/projects/')
+        view = ProjectViewSet(request=Request(request), format_kwarg=None, action='list')
+        fields = view.get_fieldset()
+        rows = list(view.values_fieldset(Project.objects.order_by('id')))
+        expected = ProjectDetailSerializer(Project.objects.order_by('id'), many=True, context={'request': request}).data
+        self.assertEqual(lean_projects(rows, fields, request), expected)
+
+    def test_list_endpoints(self):
+        response = self.client.get(reverse('task-list'), {'search': 'Task'})
+        self.assertEqual(len(response.data['results']), 9)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title', 'date_created', 'updated_at', 'complete', 'project'])
+
+
+class RendererTests(TaskRabbitTestCase):
+    def test_matches_drf_renderer(self):
+        data = {
+            'title': 'Café\u2028', 'when': timezone.now(), 'day': date.today(), 'price': Decimal('1.50'),
+            'nested': [{'id': 1, 'done': True, 'nothing': None}], 1: 'int key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        indented = FastJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(indented, JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_parser(self):
+        parsed = FastJSONParser().parse(BytesIO('{"title": "Café"}'.encode()), parser_context={})
+        self.assertEqual(parsed, {'title': 'Café'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title":'), parser_context={})
+
+    def test_api_uses_fast_renderer(self):
+        project = create_projects(1)[0]
+        response = self.client.patch(
+            reverse('task-detail', args=[project.tasks.first().pk]),
+            data=json.dumps({'title': 'Renamed', 'project': project.pk}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['title'], 'Renamed')
+
+
+class CompressionTests(TaskRabbitTestCase):
+    def setUp(self):
+        super().setUp()
+        create_projects(20)
+
+    def test_gzip(self):
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(response.content)
+        self.assertEqual(len(json.loads(body)['results']), 50)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        # The weak ETag still matches.
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_compressed(self):
+        response = self.client.get(reverse('task-list'))
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        # Below COMPRESSION_MIN_SIZE.
+        response = self.client.get(reverse('task-list'), {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    @override_settings(COMPRESSION_CONTENT_TYPES=('text/csv',))
+    def test_content_type_allowlist(self):
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_html_is_not_compressed(self):
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_streamed_export(self):
+        response = self.client.get(reverse('task-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 60)
+
+    def test_streams_are_compressed_in_large_blocks(self):
+        rows = [b'{"id":%d,"title":"Task %d","complete":false}\n' % (i, i) for i in range(5000)]
+        streamed = b''.join(middleware.gzip_stream(iter(rows), 6))
+        self.assertEqual(gzip.decompress(streamed), b''.join(rows))
+        # Within a few percent of the body compressed at once, flushed every 64KB only.
+        self.assertLess(len(streamed), len(gzip.compress(b''.join(rows), 6)) * 1.05)
+
+        project = create_projects(1, tasks_per_project=0)[0]
+        Task.objects.bulk_create(Task(title=f'Task {i}', project=project) for i in range(2000))
+        columns, queryset = export_queryset('tasks', {})
+        chunks = list(iter_export(columns, queryset, 'ndjson', buffer_size=16 * 1024))
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in chunks), Task.objects.count())
+        self.assertTrue(all(len(chunk) >= 16 * 1024 for chunk in chunks[:-1]))
+
+    @skipUnless(middleware.brotli, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(middleware.brotli.decompress(response.content))['results']), 50)
+
+
+class DatabaseTuningTests(TransactionTestCase):
+    """
+    The retries run their own transactions, which the transaction of TestCase would hide.
+    """
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 1234, 'synchronous': 'NORMAL'})
+    def test_pragmas_are_set_on_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')})
+            try:
+                with database.cursor() as cursor:
+                    values = [cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                              for name in ('journal_mode', 'busy_timeout', 'synchronous')]
+            finally:
+                database.close()
+        self.assertEqual(values, ['wal', 1234, 1])
+
+    @override_settings(DB_LOCK_RETRIES=3, DB_LOCK_BACKOFF=0)
+    def test_locked_writes_are_retried(self):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return Project.objects.create(title='Written')
+
+        with self.assertLogs('TaskRabbit.database', 'WARNING') as logs:
+            self.assertEqual(write().title, 'Written')
+        self.assertEqual(calls, [True, True, True])
+        self.assertEqual(len(logs.output), 2)
+
+    @override_settings(DB_LOCK_RETRIES=2, DB_LOCK_BACKOFF=0)
+    def test_retries_give_up_and_roll_back(self):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(Project.objects.create(title='Rolled back'))
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError), self.assertLogs('TaskRabbit.database', 'WARNING'):
+            write()
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(Project.objects.exists())
+
+    @override_settings(DB_LOCK_RETRIES=5, DB_LOCK_BACKOFF=0, DB_LOCK_MAX_WAIT=0.8,
+                       SQLITE_PRAGMAS={'busy_timeout': 300})
+    def test_retries_stop_before_the_maximum_wait(self):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            # Waits busy_timeout for the lock, then gives up.
+            calls.append(None)
+            time.sleep(0.3)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError), self.assertLogs('TaskRabbit.database', 'WARNING'):
+            write()
+        # A retry at 0.3s ends by 0.6s, one at 0.6s would end past 0.8s.
+        self.assertEqual(len(calls), 2)
+
+    def test_other_errors_and_outer_transactions_are_not_retried(self):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(None)
+            raise OperationalError('no such table: missing')
+
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+        @retry_on_locked
+        def locked():
+            calls.append(None)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError), transaction.atomic():
+            locked()
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], REPLICA_HEALTH_INTERVAL=60)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        pinned.set(False)
+        wrote.set(False)
+        replica.set(None)
+
+    def test_reads_stick_to_one_replica_until_a_write(self):
+        with mock.patch('TaskRabbit.routers.check_health', return_value=True):
+            first = self.router.db_for_read(Task)
+            self.assertIn(first, ['replica1', 'replica2'])
+            self.assertEqual({self.router.db_for_read(Project) for _ in range(10)}, {first})
+
+            self.assertEqual(self.router.db_for_write(Task), 'default')
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_unhealthy_replicas_fall_back_to_the_primary(self):
+        with mock.patch('TaskRabbit.routers.check_health', side_effect=lambda alias: alias == 'replica2') as check:
+            self.assertEqual(self.router.db_for_read(Task), 'replica2')
+            replica.set(None)
+            self.assertEqual(self.router.db_for_read(Task), 'replica2')
+            # The health of each replica is checked once per interval.
+            self.assertEqual(check.call_count, 2)
+
+            check.side_effect = lambda alias: False
+            self.router._health.clear()
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+        with self.assertLogs('TaskRabbit.routers', 'WARNING'):
+            self.assertFalse(check_health('replica1'))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'TaskRabbit'))
+        self.assertIsNone(self.router.allow_migrate('default', 'TaskRabbit'))
+
+    def test_middleware_pins_writes_and_the_next_requests(self):
+        def view(request):
+            return HttpResponse(pinned.get())
+
+        def writing_view(request):
+            self.router.db_for_write(Task)
+            return HttpResponse(pinned.get())
+
+        factory = APIRequestFactory()
+        response = middleware.ReplicaRoutingMiddleware(view)(factory.get('/tasks/'))
+        self.assertEqual(response.content, b'False')
+        self.assertNotIn('pin_primary', response.cookies)
+
+        response = middleware.ReplicaRoutingMiddleware(view)(factory.post('/tasks/'))
+        self.assertEqual(response.content, b'True')
+
+        response = middleware.ReplicaRoutingMiddleware(writing_view)(factory.get('/tasks/'))
+        self.assertEqual(response.content, b'True')
+        self.assertEqual(response.cookies['pin_primary']['max-age'], 5)
+
+        request = factory.get('/tasks/')
+        request.COOKIES['pin_primary'] = '1'
+        response = middleware.ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(response.content, b'True')
+
+
+class InstrumentationTests(TaskRabbitTestCase):
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_counts_the_queries(self):
+        task = create_projects(1)[0].tasks.first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task-detail', args=[task.pk]))
+        timing = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertIn(f'desc="{len(queries)} queries"', timing['db'])
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'total'})
+
+    @override_settings(SERVER_TIMING=True)
+    async def test_async_views_are_measured(self):
+        await sync_to_async(create_projects)(2)
+        response = await self.async_client.get(reverse('async-project-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="[1-9][0-9]* queries", .*total;dur=')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_unflagged_requests_are_not_reported(self):
+        create_projects(1)
+        # Logged at the warning level only, the line of an unflagged request is not built.
+        with mock.patch.object(RequestMetrics, 'as_dict') as as_dict:
+            response = self.client.get(reverse('project-list'))
+        self.assertNotIn('Server-Timing', response)
+        as_dict.assert_not_called()
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_flagged_requests_are_logged_as_warnings(self):
+        create_projects(2)
+        with self.assertLogs('TaskRabbit.requests', 'WARNING') as logs:
+            self.client.get(reverse('project-list'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['route'], entry['status'], entry['flags']), ('project-list', 200, ['slow']))
+        self.assertGreater(entry['queries'], 0)
+
+    @override_settings(REPEATED_QUERY_LIMIT=3, DUPLICATE_QUERY_LIMIT=2)
+    def test_repeated_and_duplicate_queries(self):
+        def execute(sql, params, many, context):
+            return None
+
+        metrics = RequestMetrics()
+        for pk in (1, 2, 3, 3, 3):
+            metrics(execute, 'SELECT * FROM task WHERE project_id = %s', (pk,), False, {})
+        metrics.duration = 0.001
+        self.assertEqual(metrics.duplicates, 2)
+        self.assertEqual(metrics.repeated(), {'SELECT * FROM task WHERE project_id = %s': 5})
+        self.assertEqual(metrics.flags(), ['duplicates', 'repeated'])
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(METRICS_ENABLED=True):
+            self.client.get(reverse('task-list'))
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('taskrabbit_requests_total{route="task-list",method="GET",status="200"}', body)
+        self.assertIn('taskrabbit_request_duration_seconds_bucket{route="task-list",method="GET",le="+Inf"}', body)
+        self.assertIn('# TYPE taskrabbit_request_queries histogram', body)
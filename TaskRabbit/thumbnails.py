@@ -0,0 +1,88 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Pillow format name and file extension of each thumbnail format.
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def thumbnail_sizes():
+    return getattr(settings, 'THUMBNAIL_SIZES', (64, 256, 1024))
+
+
+def thumbnail_formats():
+    return getattr(settings, 'THUMBNAIL_FORMATS', ('webp', 'jpeg'))
+
+
+def thumbnail_name(digest, size, fmt):
+    """
+    Returns the storage name of a thumbnail. Names are derived from the content hash of the
+    original image, so identical photos share their thumbnails and names never go stale.
+    """
+    return f'project_photos/thumbs/{digest[:2]}/{digest}_{size}.{FORMATS[fmt][1]}'
+
+
+def render_thumbnail(image, size, fmt):
+    thumbnail = image.copy()
+    # Only ever shrinks, small originals keep their size.
+    thumbnail.thumbnail((size, size), Image.LANCZOS)
+    if fmt == 'jpeg' and thumbnail.mode not in ('RGB', 'L'):
+        thumbnail = thumbnail.convert('RGB')
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format=FORMATS[fmt][0], quality=85)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(content):
+    """
+    Renders the thumbnails of an image, given as bytes, in every configured size and format.
+
+    Thumbnails already on disk are not rendered again. Returns the content hash the
+    thumbnail names are derived from.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    missing = [
+        (size, fmt) for size in thumbnail_sizes() for fmt in thumbnail_formats()
+        if not default_storage.exists(thumbnail_name(digest, size, fmt))
+    ]
+    if not missing:
+        return digest
+
+    with Image.open(io.BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    for size, fmt in missing:
+        default_storage.save(thumbnail_name(digest, size, fmt), ContentFile(render_thumbnail(image, size, fmt)))
+    return digest
+
+
+def generate_thumbnails_for_file(name):
+    """
+    Renders the thumbnails of a stored file, in a worker process of the backfill command.
+    """
+    with default_storage.open(name, 'rb') as photo:
+        return name, generate_thumbnails(photo.read())
+
+
+def thumbnail_urls(digest, request=None):
+    """
+    Returns the thumbnail URLs of a photo hash as {size: {format: url}}.
+    """
+    if not digest:
+        return {}
+
+    def url(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return {
+        str(size): {fmt: url(thumbnail_name(digest, size, fmt)) for fmt in thumbnail_formats()}
+        for size in thumbnail_sizes()
+    }
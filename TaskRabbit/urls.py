@@ -1,11 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet, TaskViewSet
+from . import async_views
+from .views import ProjectViewSet, TaskViewSet, UserViewSet
 
 router = DefaultRouter()
 router.register('projects', ProjectViewSet)
 router.register('tasks', TaskViewSet)
+router.register('users', UserViewSet)
 
 urlpatterns = [
   path('', include(router.urls)),
-]
\ No newline at end of file
+  # Async read-only endpoints, for ASGI deployments, see TaskRabbit.async_views.
+  path('async/projects/', async_views.project_list, name='async-project-list'),
+  path('async/projects/<int:pk>/', async_views.project_detail, name='async-project-detail'),
+  path('async/tasks/', async_views.task_list, name='async-task-list'),
+  path('async/tasks/<int:pk>/', async_views.task_detail, name='async-task-detail'),
+]
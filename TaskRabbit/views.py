@@ -1,10 +1,29 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from django.db.models import Q
-
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
+from django.contrib.auth.models import User
+
+from .cache import project_cache
+from .conditional import ConditionalGetMixin
+from .database import retry_on_locked
+from .export import EXPORT_FORMATS, export_queryset, iter_export
+from .fieldsets import SparseFieldsetMixin
+from .filters import filter_projects, filter_tasks
+from .lean import lean_projects, lean_tasks
+from .metrics import timed
 from .models import Project, Task
-from .serializers import ProjectSerializer, TaskSerializer
+from .search import get_search_backend
+from .stats import cached_project_stats, user_summary
+from .thumbnails import thumbnail_urls
+from .serializers import (
+    BulkTaskCreateSerializer, BulkTaskDeleteSerializer, BulkTaskUpdateSerializer,
+    ProjectSerializer, SparseFieldsMixin, TaskSerializer,
+)
 
 from drf_yasg.utils import swagger_auto_schema
 
@@ -17,11 +36,12 @@ class TaskCountSerializer(Serializer):
 
     def to_representation(self, instance):
         """
-        Calculates and returns the task counts for a project.
+        Returns the task counts for a project.
         """
         data = super(TaskCountSerializer, self).to_representation(instance)
-        total_tasks = instance.tasks.count()
-        completed_tasks = instance.tasks.filter(complete=True).count()
+        # The counters are denormalized onto the project row, reading them makes no query.
+        total_tasks = instance.total_tasks
+        completed_tasks = instance.completed_tasks
         data.update({
             'total_tasks': total_tasks,
             'completed_tasks': completed_tasks,
@@ -32,21 +52,131 @@ class ProjectMemberSerializer(Serializer):
     username = serializers.CharField(read_only=True)
     email = serializers.EmailField(read_only=True)
 
-class ProjectDetailSerializer(ProjectSerializer):
+class ProjectDetailSerializer(SparseFieldsMixin, ProjectSerializer):
     task_counts = TaskCountSerializer(read_only=True)
     members = ProjectMemberSerializer(source='members.all', many=True, read_only=True)
+    thumbnails = serializers.SerializerMethodField()
+    # Only with ?expand=tasks, prefetched by ProjectSerializationMixin.
+    tasks = TaskSerializer(many=True, read_only=True)
+    expandable_fields = ('tasks',)
 
     class Meta(ProjectSerializer.Meta):
-        fields = ('id', 'members', 'title', 'display_photo', 
-                  'date_created', 'due_date', 'task_counts',)
+        fields = ('id', 'members', 'title', 'display_photo', 'photo_status', 'thumbnails',
+                  'date_created', 'updated_at', 'due_date', 'task_counts', 'tasks',)
+
+    def get_thumbnails(self, instance):
+        """
+        URLs of the photo thumbnails by size and format, empty until they are generated.
+        """
+        return thumbnail_urls(instance.photo_digest, self.context.get('request'))
         
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['task_counts'] = TaskCountSerializer(instance).data
+        if 'task_counts' in self.fields:
+            data['task_counts'] = TaskCountSerializer(instance).data
         return data
         
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ExportMixin:
+    """
+    Adds a streaming `export` list endpoint, see TaskRabbit.export.
+    """
+    export_kind = None
+
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        columns, queryset = export_queryset(self.export_kind, request.query_params)
+        response = StreamingHttpResponse(
+            iter_export(columns, queryset, export_format), content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.export_kind}.{export_format}"'
+        return response
+
+
+class ProjectSerializationMixin(SparseFieldsetMixin):
+    """
+    Serializes projects like the project endpoints, through the project cache, with the
+    fields selected by ?fields= and ?expand=.
+    """
+    expand_fields = ('members', 'tasks')
+    field_columns = {
+        'title': ('title',),
+        'display_photo': ('display_photo',),
+        'photo_status': ('photo_status',),
+        'thumbnails': ('photo_digest',),
+        'due_date': ('due_date',),
+        'task_counts': ('total_tasks', 'completed_tasks'),
+    }
+
+    # Actions accepting ?expand=tasks. On a page of projects, of up to the largest page size,
+    # it would load every task of each of them.
+    task_expand_actions = ('retrieve',)
+
+    def get_fieldset_serializer_class(self):
+        return ProjectDetailSerializer
+
+    def get_fieldset(self):
+        fieldset = super().get_fieldset()
+        if 'tasks' in fieldset and self.action not in self.task_expand_actions:
+            raise serializers.ValidationError({
+                'expand': "Tasks are only embedded in a single project, list them with /tasks/?project=.",
+            })
+        return fieldset
+
+    def get_project_validators(self, project):
+        """
+        Returns the validators of a single project. Task edits leave the project's updated_at
+        alone, so when ?expand=tasks embeds them, the validators also cover the number and the
+        last update of its tasks, read with one aggregate query rather than loading the tasks.
+        """
+        if 'tasks' not in self.get_fieldset():
+            return self.get_page_validators([project])
+        tasks = project.tasks.aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+        last_modified = max(filter(None, (project.updated_at, tasks['updated_at'])))
+        return self.get_validators(last_modified, project.pk, project.updated_at, tasks['count'])
+
+    def prefetch_tasks(self, projects):
+        prefetch_related_objects(projects, Prefetch('tasks', queryset=Task.objects.order_by('-date_created', '-id')))
+
+    def project_rows(self, queryset):
+        """
+        Selects `.values()` rows for the lean serialization of projects.
+        """
+        return self.values_fieldset(queryset)
+
+    def serialize_projects(self, projects):
+        """
+        Serializes projects, model instances or `.values()` rows, through the project cache,
+        only the ones missing from it are rendered, after prefetching their members if selected.
+        """
+        fieldset = self.get_fieldset()
+
+        def render(missing):
+            if isinstance(missing[0], dict):
+                return lean_projects(missing, fieldset, self.request)
+            if 'members' in fieldset:
+                prefetch_related_objects(missing, Prefetch('members', queryset=User.objects.only('username', 'email')))
+            if 'tasks' in fieldset:
+                self.prefetch_tasks(missing)
+            return ProjectDetailSerializer(
+                missing, many=True, fields=fieldset, context=self.get_serializer_context(),
+            ).data
+
+        with timed('serialize'):
+            if 'tasks' in fieldset:
+                # Task edits leave the updated_at of their project, the cache key, alone.
+                return render(projects)
+            variant = f"{self.request.build_absolute_uri('/')}|{','.join(sorted(fieldset))}"
+            return project_cache.get_many(projects, variant, render)
+
+
+class ProjectViewSet(ProjectSerializationMixin, ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing projects.
 
@@ -55,45 +185,53 @@ class ProjectViewSet(viewsets.ModelViewSet):
     """
     queryset = Project.objects.all()
     serializer_class = ProjectDetailSerializer
-    
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['title',]  # Fields to search on
+    export_kind = 'projects'
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        search_term = self.request.query_params.get('search', '')
+        search_term = self.request.query_params.get('search', '').strip()
 
         if search_term:
-            queryset = queryset.filter(Q(title__icontains=search_term))
+            queryset = get_search_backend().search(queryset, search_term)
         return queryset
 
     @swagger_auto_schema(
         operation_description="""
-        Retrieve a list of all projects.
+        Retrieve a page of projects, newest first.
 
-        Optionally filter projects by completion status using the 'completed' query parameter (true/false).
+        Optionally filter projects by completion status using the 'completed' query parameter (true/false),
+        by member with 'member' (a user ID), by creation date with 'created_after'/'created_before' (ISO 8601), and search project titles with the 'search' query parameter, results being ordered by relevance.
+        Pages are cursor based: follow the 'next'/'previous' links and use 'page_size' to change the page size.
+        Pick the returned fields with 'fields' (comma separated) and embed the members with 'expand' (members), the tasks are only embedded in a single project.
         """,
         responses={200: ProjectDetailSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
         """
-        Retrieve a list of all projects.
+        Retrieve a page of projects, newest first.
 
-        Optionally filter projects by completion status using the 'completed' query parameter (true/false).
+        Optionally filter projects by completion status using the 'completed' query parameter (true/false),
+        by member with 'member' (a user ID), by creation date with 'created_after'/'created_before' (ISO 8601), and search project titles with the 'search' query parameter, results being ordered by relevance.
+        Pages are cursor based: follow the 'next'/'previous' links and use 'page_size' to change the page size.
+        Pick the returned fields with 'fields' (comma separated) and embed the members with 'expand' (members), the tasks are only embedded in a single project.
         """
-        completed = request.query_params.get('completed', None)
-        queryset = self.get_queryset()
-        if completed is not None:
-            if completed == 'true':
-                queryset = [project for project in queryset if project.is_completed()]
-            elif completed == 'false':
-                queryset = [project for project in queryset if not project.is_completed() and project.tasks.filter(complete=True).count()>0]
+        queryset = self.project_rows(filter_projects(self.get_queryset(), request.query_params))
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        validators = self.get_page_validators(rows)
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+
+        if page is not None:
+            response = self.get_paginated_response(self.serialize_projects(page))
+        else:
+            response = Response(self.serialize_projects(rows))
+        return self.set_validators(response, *validators)
 
     @swagger_auto_schema(
-        operation_description="Get a specific project by ID.",
+        operation_description="Get a specific project by ID. Accepts the 'fields' and 'expand' parameters of the project list, and 'expand=tasks' to embed its tasks.",
         responses={200: ProjectSerializer}
     )
     def retrieve(self, request, pk=None):
@@ -101,14 +239,63 @@ class ProjectViewSet(viewsets.ModelViewSet):
         Retrieve a specific project by its ID.
         """
         project = self.get_object()
-        serializer = self.get_serializer(project)
-        return Response(serializer.data)
+        validators = self.get_project_validators(project)
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+
+        return self.set_validators(Response(self.serialize_projects([project])[0]), *validators)
+
+    @swagger_auto_schema(
+        operation_description="""
+        Stream every project as NDJSON (default) or CSV, picked with 'export_format' (ndjson/csv).
+
+        Accepts the same 'completed', 'created_after' and 'created_before' filters as the project list.
+        """,
+        responses={200: "Streamed projects."}
+    )
+    @action(detail=False)
+    def export(self, request):
+        """
+        Stream the filtered projects without paginating them.
+        """
+        return super().export(request)
+
+    @swagger_auto_schema(
+        operation_description="Hit and miss counters of the project cache in this worker process.",
+        responses={200: "Cache statistics."}
+    )
+    @action(detail=False, url_path='cache-stats')
+    def cache_stats(self, request):
+        """
+        Returns the hit and miss counters of the project cache, to help sizing it.
+        """
+        return Response(project_cache.stats())
+
+    @swagger_auto_schema(
+        operation_description="""
+        Dashboard statistics in one request: total, completed and overdue tasks and completion ratio overall and for the
+        projects with the most open tasks, and the workload of the busiest members. Tasks are overdue when incomplete past
+        their project's due date.
+
+        Accepts the same 'completed', 'created_after' and 'created_before' filters as the project list, to window the projects.
+        Cached for a few seconds.
+        """,
+        responses={200: "Project statistics."}
+    )
+    @action(detail=False)
+    def stats(self, request):
+        """
+        Returns the task totals of the filtered projects, their top projects and the workload of their busiest members.
+        """
+        return Response(cached_project_stats(request.query_params))
 
     @swagger_auto_schema(
         operation_description="Create a new project.",
         request_body=ProjectSerializer,
         responses={201: ProjectSerializer}
     )
+    @retry_on_locked
     def create(self, request, *args, **kwargs):
         """
         Create a new project.
@@ -125,6 +312,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         request_body=ProjectSerializer,
         responses={200: ProjectSerializer}
     )
+    @retry_on_locked
     def update(self, request, pk=None, *args, **kwargs):
         """
         Update a project with the provided ID.
@@ -132,7 +320,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
         The request body should include the updated project data as specified in the ProjectSerializer class.
         """
         project = self.get_object()
-        serializer = self.get_serializer(project, data=request.data)
+        # partial_update() comes through here with partial=True.
+        serializer = self.get_serializer(project, data=request.data, partial=kwargs.pop('partial', False))
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         return Response(serializer.data)
@@ -141,12 +330,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
       operation_description="Delete a project with the provided ID.",
       responses={204: "Project deleted successfully."}
     )
+    @retry_on_locked
     def destroy(self, request, pk=None, *args, **kwargs):
         self.perform_destroy(self.get_object())
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(SparseFieldsetMixin, ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing tasks.
 
@@ -155,37 +345,63 @@ class TaskViewSet(viewsets.ModelViewSet):
     """
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    export_kind = 'tasks'
+    field_columns = {
+        'title': ('title',),
+        'project': ('project',),
+        'complete': ('complete',),
+    }
 
     @swagger_auto_schema(
         operation_description="""
-        Retrieve a list of all tasks.
+        Retrieve a page of tasks, newest first.
 
         Optionally filter tasks based on various criteria using request query parameters:
             * project: Filter tasks associated with a specific project ID.
             * completed: Filter tasks based on their completion status (true/false).
+            * member: Filter tasks of the projects a user, given by ID, is a member of.
+            * created_after, created_before: Filter tasks created in a date range (ISO 8601).
+            * search: Search task titles, results being ordered by relevance.
+            * page_size: Number of tasks per page, follow the 'next'/'previous' cursor links for more.
+            * fields: Comma separated fields to return, all of them by default.
         """,
         responses={200: TaskSerializer(many=True)},
         query_serializer=TaskSerializer  # Allow filtering by task fields in request
     )
     def list(self, request, *args, **kwargs):
         """
-        Retrieve a list of all tasks.
+        Retrieve a page of tasks, newest first.
 
         Optionally filter tasks based on various criteria using request query parameters:
             * project: Filter tasks associated with a specific project ID.
             * completed: Filter tasks based on their completion status (true/false).
+            * member: Filter tasks of the projects a user, given by ID, is a member of.
+            * created_after, created_before: Filter tasks created in a date range (ISO 8601).
+            * search: Search task titles, results being ordered by relevance.
+            * page_size: Number of tasks per page, follow the 'next'/'previous' cursor links for more.
+            * fields: Comma separated fields to return, all of them by default.
         """
-        queryset = self.get_queryset()
-        project_id = request.query_params.get('project', None)
-        completed = request.query_params.get('completed', None)
-
-        if project_id:
-            queryset = queryset.filter(project=project_id)
-        if completed is not None:
-            queryset = queryset.filter(complete=completed)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = filter_tasks(self.get_queryset(), request.query_params)
+        search_term = request.query_params.get('search', '').strip()
+        if search_term:
+            queryset = get_search_backend().search(queryset, search_term)
+
+        # Plain `.values()` rows, serialized by TaskRabbit.lean without model instances.
+        queryset = self.values_fieldset(queryset)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        validators = self.get_page_validators(rows)
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+
+        with timed('serialize'):
+            data = lean_tasks(rows, self.get_fieldset())
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        return self.set_validators(response, *validators)
 
     @swagger_auto_schema(
         operation_description="Get a specific task by ID.",
@@ -196,14 +412,21 @@ class TaskViewSet(viewsets.ModelViewSet):
         Retrieve a specific task by its ID.
         """
         task = self.get_object()
-        serializer = self.get_serializer(task)
-        return Response(serializer.data)
+        validators = self.get_validators(task.updated_at, task.pk)
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+
+        with timed('serialize'):
+            data = self.get_serializer(task).data
+        return self.set_validators(Response(data), *validators)
 
     @swagger_auto_schema(
         operation_description="Create a new task within a specific project.",
         request_body=TaskSerializer,
         responses={201: TaskSerializer}
     )
+    @retry_on_locked
     def create(self, request, *args, **kwargs):
         """
         Create a new task associated with a specific project.
@@ -222,7 +445,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(project=project)  # Set the project relationship explicitly
-        headers = self.get_success_header(serializer.data)
+        headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @swagger_auto_schema(
@@ -230,6 +453,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         request_body=TaskSerializer,
         responses={200: TaskSerializer}
     )
+    @retry_on_locked
     def update(self, request, pk=None, *args, **kwargs):
         """
         Update a task with the provided ID.
@@ -237,7 +461,8 @@ class TaskViewSet(viewsets.ModelViewSet):
         The request body should include the updated task data as specified in the TaskSerializer class.
         """
         task = self.get_object()
-        serializer = self.get_serializer(task, data=request.data)
+        # partial_update() comes through here with partial=True.
+        serializer = self.get_serializer(task, data=request.data, partial=kwargs.pop('partial', False))
         serializer.is_valid(raise_exception=True)
         serializer.save()  # No need to set project as it's already linked
         return Response(serializer.data)
@@ -246,8 +471,189 @@ class TaskViewSet(viewsets.ModelViewSet):
       operation_description="Delete a task with the provided ID.",
       responses={204: "Task deleted successfully."}
     )
+    @retry_on_locked
     def destroy(self, request, pk=None, *args, **kwargs):
         self.perform_destroy(self.get_object())
         return Response(status=status.HTTP_204_NO_CONTENT)
-    
-    
+
+    @swagger_auto_schema(
+        operation_description="""
+        Stream every task as NDJSON (default) or CSV, picked with 'export_format' (ndjson/csv).
+
+        Accepts the same 'project', 'completed', 'created_after' and 'created_before' filters as the task list.
+        """,
+        responses={200: "Streamed tasks."}
+    )
+    @action(detail=False)
+    def export(self, request):
+        """
+        Stream the filtered tasks without paginating them.
+        """
+        return super().export(request)
+
+    def validate_bulk(self, serializer_class, data):
+        """
+        Validates a bulk request body, a non-empty list of at most BULK_MAX_ITEMS items.
+
+        Returns the validated items and their errors, both aligned with the request items.
+        """
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 5000)
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError({'error': 'Expected a non-empty list of tasks.'})
+        if len(data) > max_items:
+            raise serializers.ValidationError({'error': f'At most {max_items} tasks per request.'})
+
+        items, errors = [], []
+        for item in data:
+            serializer = serializer_class(data=item)
+            valid = serializer.is_valid()
+            items.append(serializer.validated_data if valid else None)
+            errors.append({} if valid else dict(serializer.errors))
+        return items, errors
+
+    def bulk_error_response(self, errors):
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description="""
+        Create many tasks in one request.
+
+        The request body is a list of tasks with 'title', 'project' and optionally 'complete'.
+        Nothing is created if any task is invalid: the response then holds an 'errors' list with
+        the errors of each task, at the same position as the task in the request.
+        """,
+        request_body=BulkTaskCreateSerializer(many=True),
+        responses={201: TaskSerializer(many=True)}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @retry_on_locked
+    def bulk(self, request):
+        """
+        Create many tasks at once, validating all their projects in one query.
+        """
+        items, errors = self.validate_bulk(BulkTaskCreateSerializer, request.data)
+
+        project_ids = {item['project'] for item in items if item}
+        existing = set(Project.objects.filter(pk__in=project_ids).values_list('pk', flat=True))
+        for item, item_errors in zip(items, errors):
+            if item and item['project'] not in existing:
+                item_errors['project'] = ['Project with provided ID does not exist.']
+        if any(errors):
+            return self.bulk_error_response(errors)
+
+        tasks = Task.objects.bulk_create(
+            [Task(title=item['title'], project_id=item['project'], complete=item['complete']) for item in items],
+            batch_size=500,
+        )
+        return Response(self.get_serializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    @swagger_auto_schema(
+        operation_description="""
+        Update many tasks in one request.
+
+        The request body is a list of objects with the task 'id' and the 'title' and/or 'complete'
+        value to set. Nothing is updated if any item is invalid or refers to a missing task, the
+        errors are reported per item like for bulk creation.
+        """,
+        request_body=BulkTaskUpdateSerializer(many=True),
+        responses={200: TaskSerializer(many=True)}
+    )
+    @retry_on_locked
+    def bulk_update(self, request):
+        """
+        Update the title or completion of many tasks at once.
+        """
+        items, errors = self.validate_bulk(BulkTaskUpdateSerializer, request.data)
+
+        with transaction.atomic():
+            tasks = Task.objects.select_for_update().in_bulk([item['id'] for item in items if item])
+            for item, item_errors in zip(items, errors):
+                if item and item['id'] not in tasks:
+                    item_errors['id'] = ['Task with provided ID does not exist.']
+            if any(errors):
+                return self.bulk_error_response(errors)
+
+            fields = set()
+            for item in items:
+                task = tasks[item['id']]
+                for field in ('title', 'complete'):
+                    if field in item:
+                        setattr(task, field, item[field])
+                        fields.add(field)
+            if fields:
+                Task.objects.bulk_update(tasks.values(), fields, batch_size=500)
+
+        updated = [tasks[item['id']] for item in items]
+        return Response(self.get_serializer(updated, many=True).data)
+
+    @bulk.mapping.delete
+    @swagger_auto_schema(
+        operation_description="""
+        Delete many tasks in one request.
+
+        The request body is an object with the list of task 'ids' to delete. Nothing is deleted
+        if any of them does not exist, the response then lists the 'missing' IDs.
+        """,
+        request_body=BulkTaskDeleteSerializer,
+        responses={204: "Tasks deleted successfully."}
+    )
+    @retry_on_locked
+    def bulk_destroy(self, request):
+        """
+        Delete many tasks at once.
+        """
+        serializer = BulkTaskDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+
+        with transaction.atomic():
+            tasks = Task.objects.filter(pk__in=ids)
+            missing = ids - set(tasks.values_list('pk', flat=True))
+            if missing:
+                return Response({'missing': sorted(missing)}, status=status.HTTP_400_BAD_REQUEST)
+            tasks.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserViewSet(ProjectSerializationMixin, ConditionalGetMixin, viewsets.GenericViewSet):
+    """
+    API endpoints for the projects of a user.
+    """
+    queryset = User.objects.all()
+
+    @swagger_auto_schema(
+        operation_description="""
+        Retrieve a page of the projects a user is a member of, newest first.
+
+        Accepts the same 'completed', 'created_after' and 'created_before' filters and 'page_size' as the project list.
+        """,
+        responses={200: ProjectDetailSerializer(many=True)}
+    )
+    @action(detail=True)
+    def projects(self, request, pk=None):
+        """
+        Retrieve a page of the projects of a user, found through the members index.
+        """
+        user = self.get_object()
+        queryset = self.project_rows(filter_projects(Project.objects.filter(members=user.pk), request.query_params))
+
+        page = self.paginate_queryset(queryset)
+        validators = self.get_page_validators(page)
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(self.get_paginated_response(self.serialize_projects(page)), *validators)
+
+    @swagger_auto_schema(
+        operation_description="Project and task counts of a user: projects, total, completed, open and overdue tasks.",
+        responses={200: "User summary."}
+    )
+    @action(detail=True)
+    def summary(self, request, pk=None):
+        """
+        Returns the project and task counts of a user, in one query over the memberships.
+        """
+        user = self.get_object()
+        return Response({'id': user.pk, 'username': user.username, **user_summary(user.pk)})
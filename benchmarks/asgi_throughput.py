@@ -0,0 +1,108 @@
+"""
+Compares the throughput of the WSGI list endpoints with the async ones under ASGI, for a
+growing number of concurrent connections.
+
+Starts gunicorn twice on a generated SQLite database, once with sync workers on benmore.wsgi,
+once with uvicorn workers on benmore.asgi, and loads each with keep-alive connections:
+
+    python benchmarks/asgi_throughput.py [--projects 2000] [--workers 2] [--concurrency 1 10 50]
+
+Needs gunicorn and uvicorn. Unlike the other benchmarks, the servers run in their own
+processes, so the database is a temporary file instead of a test database.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from httpload import fetch, gunicorn, percentile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "wsgi": (["benmore.wsgi"], ["/projects/?page_size=50", "/tasks/?page_size=50"]),
+    "asgi": (["benmore.asgi:application", "-c", "benmore/gunicorn_asgi.py"],
+             ["/async/projects/?page_size=50", "/async/tasks/?page_size=50"]),
+}
+
+
+async def client(port, paths, deadline, latencies, errors):
+    reader = writer = None
+    i = 0
+    while time.monotonic() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        started = time.perf_counter()
+        try:
+            status, keep_alive = await fetch(reader, writer, paths[i % len(paths)])
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append(None)
+            writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+        i += 1
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, paths, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client(port, paths, deadline, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def report(name, concurrency, latencies, errors, duration):
+    latencies.sort()
+    p99 = percentile(latencies, 0.99)
+    print(
+        f"{name:>5} {concurrency:>11} {len(latencies) / duration:>10.1f} "
+        f"{statistics.median(latencies) * 1000 if latencies else 0:>9.1f} {p99 * 1000:>9.1f} {len(errors):>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=10, help="Tasks per project.")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers of each server.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per concurrency level.")
+    args = parser.parse_args()
+
+    for module in ("gunicorn", "uvicorn"):
+        if subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True).returncode:
+            parser.error(f"{module} is not installed.")
+
+    tmpdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_PATH=os.path.join(tmpdir, "db.sqlite3"), DJANGO_SETTINGS_MODULE="benmore.settings")
+    try:
+        manage = [sys.executable, "manage.py"]
+        subprocess.run([*manage, "migrate", "-v", "0"], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([*manage, "generate_data", "--projects", str(args.projects), "--tasks-per-project",
+                        str(args.tasks), "--images", "skip"], cwd=BASE_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        print(f"\n{'':>5} {'connections':>11} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, (target, paths) in SERVERS.items():
+            with gunicorn(target, BASE_DIR, env, workers=args.workers) as port:
+                for concurrency in args.concurrency:
+                    latencies, errors = asyncio.run(load(port, paths, concurrency, args.duration))
+                    report(name, concurrency, latencies, errors, args.duration)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
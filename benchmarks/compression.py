@@ -0,0 +1,79 @@
+"""
+Measures the bytes on the wire and the latency of API responses, uncompressed, gzipped and,
+when the brotli package is installed, Brotli compressed by CompressionMiddleware.
+
+Runs against a throwaway test database with the in-process test client; the transfer time is
+estimated for a given link speed:
+
+    python benchmarks/compression.py [--projects 500] [--requests 20] [--mbps 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benmore.settings")
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from TaskRabbit.middleware import brotli
+
+PATHS = ["/tasks/?page_size=500", "/projects/?page_size=500", "/tasks/export/", "/tasks/?page_size=1"]
+
+
+def measure(client, path, encoding, requests):
+    """
+    Returns the response size and the median time to get it, from the first byte of the
+    request to the last of the response.
+    """
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        timings.append(time.perf_counter() - started)
+    return len(body), statistics.median(timings), response.get("Content-Encoding", "identity")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per path and encoding.")
+    parser.add_argument("--mbps", type=float, default=10, help="Link speed the transfer time is estimated for.")
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    if brotli is None:
+        print("brotli is not installed, only gzip is measured.")
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        call_command("generate_data", projects=args.projects, tasks_per_project=10, images="skip", stdout=open(os.devnull, "w"))
+        client = Client()
+
+        print(f"\n{'path':<26} {'encoding':>9} {'bytes':>10} {'ratio':>6} {'server ms':>10} {'total ms':>9}")
+        for path in PATHS:
+            baseline = None
+            for encoding in encodings:
+                size, seconds, applied = measure(client, path, encoding, args.requests)
+                baseline = baseline or size
+                transfer = size * 8 / (args.mbps * 1_000_000)
+                print(
+                    f"{path:<26} {applied:>9} {size:>10} {size / baseline:>6.2f} "
+                    f"{seconds * 1000:>10.1f} {(seconds + transfer) * 1000:>9.1f}"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
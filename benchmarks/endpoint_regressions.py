@@ -0,0 +1,131 @@
+"""
+Records the query count and the p50/p95 latency of every API endpoint at growing dataset
+sizes, and fails when they regress against a JSON baseline.
+
+Runs the requests of regression.py against a throwaway test database, seeded up to
+each size in turn. A run fails when an endpoint runs more queries on a larger dataset, more
+queries than in the baseline, or is slower than the baseline by more than the tolerance:
+
+    python benchmarks/endpoint_regressions.py [--sizes 10 1000 100000] [--repeat 20]
+    python benchmarks/endpoint_regressions.py --update   # records the baseline
+
+Latencies depend on the machine: record the baseline where the comparisons run.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benmore.settings")
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+
+import regression
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endpoint_baseline.json")
+
+
+def run(sizes, repeat):
+    """
+    Returns {size: {endpoint: {queries, p50_ms, p95_ms}}}.
+    """
+    client = APIClient()
+    results, rows = {}, 0
+    for i, size in enumerate(sizes):
+        regression.seed(size - rows, seed=i)
+        rows = size
+        results[str(size)] = {
+            label: {"queries": queries, "p50_ms": round(p50 * 1000, 2), "p95_ms": round(p95 * 1000, 2)}
+            for label, (queries, p50, p95) in regression.measure(client, repeat).items()
+        }
+        print(f"  measured {len(results[str(size)])} endpoints at {size} rows")
+    return results
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """
+    Returns the regressions of `results`, against the smallest dataset for the query counts
+    and against `baseline` for both.
+    """
+    regressions = []
+    smallest = results[min(results, key=int)]
+    for size, endpoints in results.items():
+        for label, current in endpoints.items():
+            if current["queries"] > smallest[label]["queries"]:
+                regressions.append(f"{label} at {size} rows: {current['queries']} queries, "
+                                   f"{smallest[label]['queries']} on the smallest dataset")
+            recorded = baseline.get(size, {}).get(label)
+            if recorded is None:
+                continue
+            if current["queries"] > recorded["queries"]:
+                regressions.append(f"{label} at {size} rows: {current['queries']} queries, "
+                                   f"{recorded['queries']} in the baseline")
+            for key in ("p50_ms", "p95_ms"):
+                if current[key] > recorded[key] * (1 + tolerance) + slack_ms:
+                    regressions.append(f"{label} at {size} rows: {key} {current[key]}, {recorded[key]} in the baseline")
+    return regressions
+
+
+def report(results):
+    sizes = list(results)
+    print(f"\n{'endpoint':<62}" + "".join(f" {size + ' rows':>22}" for size in sizes))
+    print(f"{'':<62}" + " {:>5} {:>7} {:>8}".format("q", "p50", "p95") * len(sizes))
+    for label in results[sizes[0]]:
+        cells = "".join(
+            f" {results[size][label]['queries']:>5} {results[size][label]['p50_ms']:>7.1f} {results[size][label]['p95_ms']:>8.1f}"
+            for size in sizes
+        )
+        print(f"{label:<62}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="Task rows of each dataset.")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per endpoint and size.")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="Record the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative latency increase.")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Allowed absolute latency increase, for the fast endpoints.")
+    args = parser.parse_args()
+
+    baseline = {}
+    if not args.update:
+        if not os.path.exists(args.baseline):
+            parser.error(f"No baseline at {args.baseline}, record one with --update.")
+        with open(args.baseline) as f:
+            recorded = json.load(f)
+        # The write endpoints add rows as they are repeated, the datasets differ otherwise.
+        if recorded["repeat"] != args.repeat:
+            parser.error(f"The baseline was recorded with --repeat {recorded['repeat']}.")
+        baseline = recorded["results"]
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        results = run(sorted(args.sizes), args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    report(results)
+
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    if args.update:
+        with open(args.baseline, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nRecorded the baseline in {args.baseline}.")
+    if regressions:
+        print("\nRegressions:")
+        for regression_ in regressions:
+            print(f"  {regression_}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Prints the SQLite query plans of the hot TaskRabbit queries, to check they use the indexes.
+
+Runs against a throwaway test database seeded with a small dataset:
+
+    python benchmarks/explain_indexes.py [--projects 200] [--tasks 20]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benmore.settings")
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+
+from TaskRabbit.models import Project, Task
+from TaskRabbit.pagination import DateCreatedCursorPagination
+from TaskRabbit.search import SQLiteFTSSearchBackend
+
+
+def seed(projects, tasks_per_project):
+    Project.objects.bulk_create(Project(title=f"Project {i}") for i in range(projects))
+    Task.objects.bulk_create(
+        Task(title=f"Task {j}", project=project, complete=(j % 2 == 0))
+        for project in Project.objects.all()
+        for j in range(tasks_per_project)
+    )
+    users = User.objects.bulk_create(User(username=f"member-{i}") for i in range(20))
+    Project.members.through.objects.bulk_create(
+        Project.members.through(project_id=pk, user_id=users[(i + j) % len(users)].pk)
+        for i, pk in enumerate(Project.objects.values_list("pk", flat=True))
+        for j in range(2)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def explain(label, queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [row[-1] for row in cursor.fetchall()]
+
+    print(f"\n{label}\n  {sql % tuple(repr(p) for p in params)}")
+    for step in plan:
+        print(f"    {step}")
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20, help="Tasks per project.")
+    args = parser.parse_args()
+
+    if connection.vendor != "sqlite":
+        parser.error("EXPLAIN QUERY PLAN is SQLite specific.")
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.projects, args.tasks)
+        project = Project.objects.order_by("pk")[args.projects // 2]
+        member = User.objects.get(username="member-0").pk
+        page = ("-date_created", "-id")
+        search = SQLiteFTSSearchBackend().search
+        ranked = DateCreatedCursorPagination.search_ordering
+
+        plans = {
+            "tasks by project and completion, first page": explain(
+                "GET /tasks/?project=&completed=",
+                Task.objects.filter(project=project, complete=True).order_by(*page)[:50],
+            ),
+            "tasks by project, first page": explain(
+                "GET /tasks/?project=",
+                Task.objects.filter(project=project).order_by(*page)[:50],
+            ),
+            "tasks, deep page": explain(
+                "GET /tasks/?cursor=",
+                Task.objects.filter(date_created__lt=project.date_created).order_by(*page)[:50],
+            ),
+            "completed task count": explain(
+                "Project.refresh_task_counts",
+                Task.objects.filter(project=project, complete=True).values("pk"),
+            ),
+            "projects, first page": explain(
+                "GET /projects/",
+                Project.objects.order_by(*page)[:50],
+            ),
+            "projects by due date": explain(
+                "projects due before a date",
+                Project.objects.filter(due_date__lte=project.date_created.date()).values("pk"),
+            ),
+            "completed projects": explain(
+                "GET /projects/?completed=true",
+                Project.objects.filter(completed_tasks=F("total_tasks")).order_by(*page)[:50],
+            ),
+            "projects of a member": explain(
+                "GET /users/<id>/projects/",
+                Project.objects.filter(members=member).order_by(*page)[:50],
+            ),
+            # Every seeded title matches, the FTS table must still be probed once per query.
+            "project search": explain(
+                "GET /projects/?search=",
+                search(Project.objects.all(), "Project").order_by(*ranked)[:50],
+            ),
+            "task search": explain(
+                "GET /tasks/?search=",
+                search(Task.objects.all(), "Task").order_by(*ranked)[:50],
+            ),
+            "member summary": explain(
+                "GET /users/<id>/summary/",
+                Project.members.through.objects.filter(user=member).values("project_id"),
+            ),
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\nSummary")
+    for label, plan in plans.items():
+        uses_index = any(
+            f"USING {kind}" in step for step in plan for kind in ("INDEX", "COVERING INDEX", "INTEGER PRIMARY KEY")
+        )
+        sorts = any("TEMP B-TREE" in step for step in plan)
+        # A correlated subquery would run its own MATCH for every result row.
+        fts_probes = sum("VIRTUAL TABLE INDEX" in step for step in plan)
+        correlated = any("CORRELATED" in step for step in plan)
+        print(f"  {label:<45} index={'yes' if uses_index else 'no':<4} temp-sort={'yes' if sorts else 'no':<4} "
+              f"fts-probes={fts_probes} correlated={'yes' if correlated else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Helpers of the HTTP load benchmarks: a minimal asyncio HTTP/1.1 client with keep-alive,
+and gunicorn servers started on a free local port.
+
+The client is deliberately small, no dependency has to be installed to load a server, and
+the time spent in it stays negligible next to the requests.
+"""
+import contextlib
+import json
+import socket
+import subprocess
+import sys
+import time
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with status {process.returncode}.")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The server did not listen on port {port} within {timeout}s.")
+
+
+@contextlib.contextmanager
+def gunicorn(target, cwd, env, workers=1, threads=1):
+    """
+    Runs `gunicorn <target>`, with gthread workers when `threads` is more than 1, and yields
+    its port once it listens.
+    """
+    port = free_port()
+    worker_class = ["--worker-class", "gthread", "--threads", str(threads)] if threads > 1 else []
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *target, "--workers", str(workers), *worker_class,
+         "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=cwd, env=env,
+    )
+    try:
+        wait_for(port, process)
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def read_body(reader, headers):
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            chunks.append(await reader.readexactly(size + 2))
+            if size == 0:
+                return b"".join(chunks)
+    return None
+
+
+async def fetch(reader, writer, path, method="GET", body=None):
+    """
+    Sends a request on an open connection, `body` being encoded as JSON. Returns the status
+    and whether the server keeps the connection open.
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n"
+    if body is not None:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+    writer.write(head.encode() + b"\r\n" + payload)
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+    headers = {name.lower(): value for name, value in headers.items()}
+    if await read_body(reader, headers) is None:
+        # Neither a length nor chunks: the body ends with the connection.
+        await reader.read()
+        return status, False
+    return status, headers.get("connection", "").lower() != "close"
+
+
+def percentile(values, fraction):
+    """
+    Returns the `fraction` percentile of sorted `values`.
+    """
+    return values[max(int(len(values) * fraction) - 1, 0)] if values else 0
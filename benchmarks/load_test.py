@@ -0,0 +1,243 @@
+"""
+Replays reproducible mixes of API requests against the WSGI app under gunicorn, and reports
+the requests per second, the latency percentiles and the error rate of each operation, for
+several worker and thread configurations.
+
+Every configuration and mix starts from a copy of the same generated SQLite database, and
+each connection draws its requests from a random generator seeded with --seed and its
+index, so that runs with the same arguments replay the same requests:
+
+    python benchmarks/load_test.py [--configs 1x1 2x1 4x1 2x4] [--mix browse mixed write]
+                                   [--concurrency 20] [--duration 30] [--json results.json]
+
+A configuration is WORKERSxTHREADS, gthread workers serving the threads. Needs gunicorn, like
+asgi_throughput.py the servers run in their own processes, on a temporary database file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from httpload import fetch, gunicorn, percentile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_search(rng, data):
+    return "GET", f"/projects/?search={rng.choice(data['words'])}&page_size=20", None
+
+
+def project_detail(rng, data):
+    return "GET", f"/projects/{rng.choice(data['projects'])}/", None
+
+
+def task_list(rng, data):
+    return "GET", f"/tasks/?project={rng.choice(data['projects'])}&page_size=50", None
+
+
+def task_toggle(rng, data):
+    return "PATCH", f"/tasks/{rng.choice(data['tasks'])}/", {"complete": rng.random() < 0.5}
+
+
+def bulk_insert(rng, data):
+    project = rng.choice(data["projects"])
+    return "POST", "/tasks/bulk/", [{"title": f"Load test task {i}", "project": project} for i in range(20)]
+
+
+OPERATIONS = {
+    "project_search": project_search,
+    "project_detail": project_detail,
+    "task_list": task_list,
+    "task_toggle": task_toggle,
+    "bulk_insert": bulk_insert,
+}
+
+# Weights of the operations of each mix.
+MIXES = {
+    "browse": {"project_search": 30, "project_detail": 30, "task_list": 40},
+    "mixed": {"project_search": 20, "project_detail": 25, "task_list": 30, "task_toggle": 20, "bulk_insert": 5},
+    "write": {"task_toggle": 70, "bulk_insert": 30},
+}
+
+
+def parse_config(value):
+    try:
+        workers, threads = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not WORKERSxTHREADS, like 4x1.")
+    return workers, threads
+
+
+def sample(path):
+    """
+    Returns the project and task ids, and words of the project titles to search, of the
+    database at `path`.
+    """
+    with sqlite3.connect(path) as db:
+        projects = [pk for pk, in db.execute('SELECT id FROM "TaskRabbit_project" ORDER BY id')]
+        tasks = [pk for pk, in db.execute('SELECT id FROM "TaskRabbit_task" ORDER BY id')]
+        titles = [title for title, in db.execute('SELECT title FROM "TaskRabbit_project" ORDER BY id LIMIT 500')]
+    db.close()
+    words = sorted({word for title in titles for word in title.split() if word.isalpha()})
+    return {"projects": projects, "tasks": tasks, "words": words}
+
+
+def copy_database(source, target):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+
+
+async def client(port, rng, operations, weights, data, recording, deadline, results):
+    """
+    Makes the requests drawn by `rng` until `deadline`, recording them once `recording`
+    is reached, as results[operation] = [latencies, errors].
+    """
+    reader = writer = None
+    while time.monotonic() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        method, path, body = OPERATIONS[operation](rng, data)
+        if writer is None:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        started = time.perf_counter()
+        try:
+            status, keep_alive = await fetch(reader, writer, path, method, body)
+        except (OSError, asyncio.IncompleteReadError):
+            status, keep_alive = None, False
+        elapsed = time.perf_counter() - started
+        if time.monotonic() >= recording:
+            latencies, errors = results.setdefault(operation, [[], 0])
+            if status is None or status >= 400:
+                results[operation][1] = errors + 1
+            else:
+                latencies.append(elapsed)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, mix, data, concurrency, warmup, duration, seed):
+    operations, weights = zip(*MIXES[mix].items())
+    recording = time.monotonic() + warmup
+    deadline = recording + duration
+    results = [{} for _ in range(concurrency)]
+    await asyncio.gather(*(
+        client(port, random.Random(f"{seed}-{i}"), operations, weights, data, recording, deadline, results[i])
+        for i in range(concurrency)
+    ))
+    merged = {}
+    for result in results:
+        for operation, (latencies, errors) in result.items():
+            merged.setdefault(operation, [[], 0])
+            merged[operation][0].extend(latencies)
+            merged[operation][1] += errors
+    return merged
+
+
+def summarize(latencies, errors, duration):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "rps": round(total / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else 0,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "error_rate": round(errors / total, 4) if total else 0,
+    }
+
+
+def row(name, summary):
+    return (f"{name:<16} {summary['requests']:>9} {summary['rps']:>9.1f} {summary['p50_ms']:>8.1f} "
+            f"{summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['error_rate']:>8.2%}")
+
+
+HEADER = f"{'':<16} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}"
+
+
+def run(args, env, seed_path, db_path, data):
+    """
+    Returns {config: {mix: {operation or "total": summary}}}.
+    """
+    results = {}
+    for workers, threads in args.configs:
+        config = f"{workers}x{threads}"
+        for mix in args.mix:
+            copy_database(seed_path, db_path)
+            with gunicorn(["benmore.wsgi"], BASE_DIR, env, workers=workers, threads=threads) as port:
+                merged = asyncio.run(load(port, mix, data, args.concurrency, args.warmup, args.duration, args.seed))
+            summaries = {operation: summarize(*merged[operation], args.duration) for operation in sorted(merged)}
+            summaries["total"] = summarize(
+                [latency for latencies, _ in merged.values() for latency in latencies],
+                sum(errors for _, errors in merged.values()), args.duration,
+            )
+            results.setdefault(config, {})[mix] = summaries
+
+            print(f"\n{config} ({workers} workers, {threads} threads), {mix} mix, {args.concurrency} connections")
+            print(HEADER)
+            for name, summary in summaries.items():
+                print(row(name, summary))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--configs", type=parse_config, nargs="+", default=[(1, 1), (2, 1), (4, 1), (2, 4)],
+                        help="Gunicorn WORKERSxTHREADS configurations to compare.")
+    parser.add_argument("--mix", nargs="+", choices=list(MIXES), default=["mixed"])
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent keep-alive connections.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of recorded load per configuration and mix.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before the recording starts.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the dataset and of the requests.")
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=10, help="Tasks per project.")
+    parser.add_argument("--json", help="Also write the results to this file, to compare runs.")
+    args = parser.parse_args()
+
+    if subprocess.run([sys.executable, "-c", "import gunicorn"], capture_output=True).returncode:
+        parser.error("gunicorn is not installed.")
+
+    tmpdir = tempfile.mkdtemp()
+    seed_path, db_path = os.path.join(tmpdir, "seed.sqlite3"), os.path.join(tmpdir, "db.sqlite3")
+    env = dict(os.environ, DATABASE_PATH=db_path, DJANGO_SETTINGS_MODULE="benmore.settings")
+    try:
+        manage = [sys.executable, "manage.py"]
+        seed_env = dict(env, DATABASE_PATH=seed_path)
+        subprocess.run([*manage, "migrate", "-v", "0"], cwd=BASE_DIR, env=seed_env, check=True)
+        subprocess.run([*manage, "generate_data", "--projects", str(args.projects), "--tasks-per-project",
+                        str(args.tasks), "--images", "skip", "--seed", str(args.seed)], cwd=BASE_DIR,
+                       env=seed_env, check=True, stdout=subprocess.DEVNULL)
+        results = run(args, env, seed_path, db_path, sample(seed_path))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print(f"\nTotals, {args.concurrency} connections")
+    print(f"{'config, mix':<16}" + HEADER[16:])
+    for config, mixes in results.items():
+        for mix, summaries in mixes.items():
+            print(row(f"{config} {mix}", summaries["total"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {key: value for key, value in vars(args).items() if key != "json"}, "results": results},
+                      f, indent=2)
+            f.write("\n")
+        print(f"\nWrote the results to {args.json}.")
+
+
+if __name__ == "__main__":
+    main()
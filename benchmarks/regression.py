@@ -0,0 +1,167 @@
+"""
+Query count and latency regression harness for the endpoints of the API router.
+
+ENDPOINTS makes a representative request to every endpoint, as (route name, method) of
+TaskRabbit.urls.router. The query count tests of TaskRabbit.tests check that none of them
+runs more queries on a larger dataset, and benchmarks/endpoint_regressions.py records their
+query counts and latencies at several dataset sizes and compares them with a JSON baseline.
+"""
+import gc
+import statistics
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from TaskRabbit.models import Project, Task
+from TaskRabbit.urls import router
+
+PAGE = {"page_size": 50}
+
+
+def first(model):
+    return model.objects.order_by("pk").first()
+
+
+def scratch():
+    # Tasks are written to a project of their own, the reads of the first one stay comparable.
+    return Project.objects.get_or_create(title="Regression scratch project")[0]
+
+
+def new_task():
+    return Task.objects.create(title="Regression task", project=scratch())
+
+
+def new_project():
+    project = Project.objects.create(title="Regression project")
+    Task.objects.bulk_create(Task(title=f"Regression task {i}", project=project) for i in range(10))
+    return project
+
+
+def bulk_items():
+    return [{"title": f"Bulk task {i}", "project": scratch().pk} for i in range(20)]
+
+
+def url(name, *args):
+    return lambda: reverse(name, args=[arg() for arg in args])
+
+
+def pk(model, factory=None):
+    return lambda: (factory() if factory else first(model)).pk
+
+
+# (route name, method, path, query parameters or request body). Callables, and callable
+# parameter values, are called before the request: the objects they create are not part of
+# its queries.
+ENDPOINTS = [
+    ("api-root", "get", url("api-root"), None),
+    ("project-list", "get", url("project-list"), PAGE),
+    ("project-list", "get", url("project-list"), {**PAGE, "search": lambda: first(Project).title.split()[0]}),
+    ("project-list", "get", url("project-list"), {**PAGE, "fields": "id,title", "expand": "members"}),
+    ("project-list", "post", url("project-list"), {"title": "New project"}),
+    ("project-cache-stats", "get", url("project-cache-stats"), None),
+    ("project-export", "get", url("project-export"), {"completed": "true"}),
+    ("project-stats", "get", url("project-stats"), None),
+    ("project-detail", "get", url("project-detail", pk(Project)), None),
+    ("project-detail", "get", url("project-detail", pk(Project)), {"expand": "tasks"}),
+    ("project-detail", "put", url("project-detail", pk(Project)), {"title": "Renamed project"}),
+    ("project-detail", "patch", url("project-detail", pk(Project)), {"title": "Patched project"}),
+    ("project-detail", "delete", url("project-detail", pk(Project, new_project)), None),
+    ("task-list", "get", url("task-list"), PAGE),
+    ("task-list", "get", url("task-list"), {**PAGE, "project": pk(Project)}),
+    ("task-list", "post", url("task-list"), {"title": "New task", "project": pk(Project, scratch)}),
+    ("task-bulk", "post", url("task-bulk"), bulk_items),
+    ("task-bulk", "patch", url("task-bulk"), lambda: [{"id": new_task().pk, "complete": True} for _ in range(20)]),
+    ("task-bulk", "delete", url("task-bulk"), lambda: {"ids": [new_task().pk for _ in range(20)]}),
+    ("task-export", "get", url("task-export"), {"project": pk(Project)}),
+    ("task-detail", "get", url("task-detail", pk(Task)), None),
+    ("task-detail", "put", url("task-detail", pk(Task)), {"title": "Renamed task", "project": pk(Project)}),
+    ("task-detail", "patch", url("task-detail", pk(Task, new_task)), {"complete": True}),
+    ("task-detail", "delete", url("task-detail", pk(Task, new_task)), None),
+    ("user-projects", "get", url("user-projects", pk(User)), PAGE),
+    ("user-summary", "get", url("user-summary", pk(User)), None),
+]
+
+
+def router_endpoints():
+    """
+    Returns the (route name, method) of every endpoint of the router, but HEAD, which DRF
+    adds to the actions of the views once they answered a GET, with the same handler.
+    """
+    endpoints = set()
+    for pattern in router.urls:
+        actions = getattr(pattern.callback, "actions", None) or {"get": None}
+        endpoints.update((pattern.name, method) for method in actions if method != "head")
+    return endpoints
+
+
+def label(name, method, data):
+    if method != "get" or not isinstance(data, dict):
+        return f"{method.upper()} {name}"
+    # Parameters given by a callable are named without their value.
+    params = "&".join(key if callable(value) else f"{key}={value}" for key, value in data.items())
+    return f"{method.upper()} {name} {params}"
+
+
+def seed(rows, seed=0):
+    """
+    Adds `rows` tasks to the database, 10 per project, with members drawn from 20 users.
+    """
+    call_command(
+        "generate_data", projects=max(rows // 10, 1), tasks_per_project=10, users=20, images="skip",
+        seed=seed, stdout=StringIO(),
+    )
+
+
+def request(client, method, path, data):
+    """
+    Makes a request with an empty cache, returns its queries and its duration, the streamed
+    body included.
+    """
+    path, data = path(), data() if callable(data) else data
+    if isinstance(data, dict):
+        data = {key: value() if callable(value) else value for key, value in data.items()}
+    cache.clear()
+    # The query log is capped, CaptureQueriesContext would miss queries once it is full.
+    reset_queries()
+    # Like timeit, keeps garbage collections, triggered by the allocations of earlier
+    # requests, out of the timings.
+    gc.collect()
+    gc.disable()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data, format=None if method == "get" else "json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+    if response.status_code >= 400:
+        raise AssertionError(f"{method.upper()} {path} answered {response.status_code}: {response.content[:200]!r}")
+    return len(queries), elapsed
+
+
+def measure(client, repeat=1):
+    """
+    Returns {label: (queries, p50, p95)} for every endpoint, over `repeat` requests, after
+    a first one warming up the code paths of the endpoint when `repeat` is more than 1.
+    """
+    results = {}
+    for name, method, path, data in ENDPOINTS:
+        counts, timings = set(), []
+        if repeat > 1:
+            request(client, method, path, data)
+        for _ in range(repeat):
+            queries, elapsed = request(client, method, path, data)
+            counts.add(queries)
+            timings.append(elapsed)
+        timings.sort()
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        results[label(name, method, data)] = (max(counts), statistics.median(timings), p95)
+    return results
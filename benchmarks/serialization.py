@@ -0,0 +1,124 @@
+"""
+Times the serialization of 10k-row task and project payloads: ModelSerializer against the
+lean `.values()` path of TaskRabbit.lean, and DRF's JSONRenderer against the orjson one.
+
+Runs against a throwaway test database:
+
+    python benchmarks/serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benmore.settings")
+
+import django
+django.setup()
+
+from django.db import connection
+from django.db.models import Prefetch
+from django.contrib.auth.models import User
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from TaskRabbit.lean import lean_projects, lean_tasks
+from TaskRabbit.models import Project, Task
+from TaskRabbit.renderers import FastJSONParser, FastJSONRenderer, orjson
+from TaskRabbit.serializers import TaskSerializer
+from TaskRabbit.views import ProjectDetailSerializer, ProjectViewSet, TaskViewSet
+
+TASK_FIELDS = ["id", "title", "date_created", "updated_at", "complete", "project"]
+
+
+def seed(rows):
+    projects = Project.objects.bulk_create(Project(title=f"Project {i}") for i in range(rows))
+    users = User.objects.bulk_create(User(username=f"user-{i}", email=f"user-{i}@example.com") for i in range(20))
+    Project.members.through.objects.bulk_create(
+        Project.members.through(project_id=project.pk, user_id=users[i % len(users)].pk)
+        for i, project in enumerate(projects)
+    )
+    Task.objects.bulk_create(
+        Task(title=f"Task {i}", project=projects[i % len(projects)], complete=(i % 3 == 0)) for i in range(rows)
+    )
+
+
+def best(repeat, func):
+    """
+    Returns the best wall time of `repeat` runs of `func`, and its last result.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def report(label, seconds, baseline=None):
+    speedup = f"{baseline / seconds:>6.1f}x" if baseline else ""
+    print(f"  {label:<48} {seconds * 1000:>9.1f} ms {speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed, FastJSONRenderer falls back to JSONRenderer.")
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.rows)
+        request = APIRequestFactory().get("/projects/", HTTP_HOST="testserver")
+        tasks = Task.objects.order_by("-date_created", "-id")
+        projects = Project.objects.order_by("-date_created", "-id")
+        task_columns = TaskViewSet.field_columns.keys() | set(TaskViewSet.always_columns)
+        project_fields = set(ProjectDetailSerializer().fields)
+        project_columns = set(ProjectViewSet.always_columns).union(*ProjectViewSet.field_columns.values())
+
+        print(f"\nTasks, {args.rows} rows")
+        model_time, data = best(args.repeat, lambda: TaskSerializer(list(tasks), many=True).data)
+        report("ModelSerializer over model instances", model_time)
+        lean_time, lean_data = best(args.repeat, lambda: lean_tasks(list(tasks.values(*task_columns)), TASK_FIELDS))
+        report("lean, from .values() rows", lean_time, model_time)
+        assert lean_data == data
+
+        render_time, body = best(args.repeat, lambda: JSONRenderer().render(lean_data))
+        report("JSONRenderer", render_time)
+        fast_time, fast_body = best(args.repeat, lambda: FastJSONRenderer().render(lean_data))
+        report("FastJSONRenderer", fast_time, render_time)
+        assert fast_body == body
+
+        parse_time, _ = best(args.repeat, lambda: JSONParser().parse(io.BytesIO(body), parser_context={}))
+        report("JSONParser", parse_time)
+        fast_parse_time, _ = best(args.repeat, lambda: FastJSONParser().parse(io.BytesIO(body), parser_context={}))
+        report("FastJSONParser", fast_parse_time, parse_time)
+
+        print(f"\nProjects, {args.rows} rows")
+        members = Prefetch("members", queryset=User.objects.only("username", "email"))
+        model_time, data = best(args.repeat, lambda: ProjectDetailSerializer(
+            list(projects.prefetch_related(members)), many=True, context={"request": request},
+        ).data)
+        report("ModelSerializer over model instances", model_time)
+        lean_time, lean_data = best(args.repeat, lambda: lean_projects(
+            list(projects.values(*project_columns)), project_fields, request,
+        ))
+        report("lean, from .values() rows", lean_time, model_time)
+        assert lean_data == data
+
+        render_time, _ = best(args.repeat, lambda: JSONRenderer().render(lean_data))
+        report("JSONRenderer", render_time)
+        fast_time, _ = best(args.repeat, lambda: FastJSONRenderer().render(lean_data))
+        report("FastJSONRenderer", fast_time, render_time)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Shows whether readers and writers of the SQLite database wait for each other, before and after
+the tuning of TaskRabbit.database.
+
+Processes, like gunicorn workers, read task pages and create tasks through the views at the
+same time, on a copy of the same generated database, once per profile:
+
+- baseline: default journal and pragmas, a connection per request, no retries of locked writes;
+- tuned: the production SQLITE_PROFILE (WAL, busy_timeout...), persistent connections and retries.
+
+    python benchmarks/sqlite_concurrency.py [--readers 4] [--writers 2] [--duration 10]
+
+The workers run in their own processes, so the database is a temporary file instead of a test
+database.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "baseline": {"SQLITE_PROFILE": "default", "CONN_MAX_AGE": "0", "DB_LOCK_RETRIES": "0"},
+    "tuned": {"SQLITE_PROFILE": "production", "CONN_MAX_AGE": "600", "DB_LOCK_RETRIES": "5"},
+}
+
+
+def worker(role, env, projects, start, deadline, results):
+    """
+    Reads task pages or creates tasks from `start` until `deadline`, then reports the latencies
+    of the successful requests and the number of failed ones.
+    """
+    os.environ.update(env)
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import OperationalError
+    from django.test import Client
+
+    settings.DEBUG = False
+    client = Client()
+    # The first request imports the views and connects, out of the measured time.
+    client.get("/tasks/?page_size=1")
+    time.sleep(max(start - time.time(), 0))
+
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        project = random.randint(1, projects)
+        started = time.perf_counter()
+        try:
+            if role == "read":
+                response = client.get(f"/tasks/?project={project}&page_size=50")
+            else:
+                response = client.post("/tasks/", {"title": "Concurrent task", "project": project})
+        except OperationalError:
+            # "database is locked", raised by the test client instead of a 500.
+            errors += 1
+            continue
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+    results.put((role, latencies, errors))
+
+
+def percentile(values, fraction):
+    return values[max(int(len(values) * fraction) - 1, 0)] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4, help="Reading processes.")
+    parser.add_argument("--writers", type=int, default=2, help="Writing processes.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per profile.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    seeded = os.path.join(tmpdir, "seeded.sqlite3")
+    env = dict(os.environ, DATABASE_PATH=seeded, SQLITE_PROFILE="default", DJANGO_SETTINGS_MODULE="benmore.settings")
+    try:
+        manage = [sys.executable, "manage.py"]
+        subprocess.run([*manage, "migrate", "-v", "0"], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([*manage, "generate_data", "--projects", str(args.projects), "--images", "skip"],
+                       cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        context = multiprocessing.get_context("spawn")
+        print(f"\n{'':>8} {'reads/s':>8} {'read p50':>9} {'read p99':>9} {'writes/s':>9} {'write p99':>10} {'errors':>7}")
+        for name, profile in PROFILES.items():
+            database = os.path.join(tmpdir, f"{name}.sqlite3")
+            shutil.copy(seeded, database)
+            profile_env = {"DATABASE_PATH": database, "DJANGO_SETTINGS_MODULE": "benmore.settings", **profile}
+
+            results = context.Queue()
+            # Leaves the processes time to start before the clock runs.
+            start = time.time() + 5
+            deadline = start + args.duration
+            roles = ["read"] * args.readers + ["write"] * args.writers
+            processes = [
+                context.Process(target=worker, args=(role, profile_env, args.projects, start, deadline, results))
+                for role in roles
+            ]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+
+            reads = sorted(latency for role, latencies, _ in collected if role == "read" for latency in latencies)
+            writes = sorted(latency for role, latencies, _ in collected if role == "write" for latency in latencies)
+            errors = sum(count for _, _, count in collected)
+            print(
+                f"{name:>8} {len(reads) / args.duration:>8.1f} {statistics.median(reads or [0]) * 1000:>9.1f} "
+                f"{percentile(reads, 0.99) * 1000:>9.1f} {len(writes) / args.duration:>9.1f} "
+                f"{percentile(writes, 0.99) * 1000:>10.1f} {errors:>7}"
+            )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benmore.settings')
+# Under ASGI the sync code of successive requests runs on different threads, each with its own
+# connections, which persistent connections would leave open. Close them after every request.
+os.environ.setdefault('CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,18 @@
+"""
+Gunicorn configuration serving benmore.asgi with uvicorn workers:
+
+    gunicorn benmore.asgi:application -c benmore/gunicorn_asgi.py
+
+The async endpoints under /async/ then answer many concurrent connections per worker, while
+the sync DRF viewsets keep running, one at a time per worker, on Django's sync thread.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Idle keep-alive connections cost an event loop next to nothing.
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
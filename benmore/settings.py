@@ -45,14 +45,21 @@ INSTALLED_APPS = [
     'drf_yasg',
 ]
 
+# Each middleware runs on every request, once: requests are measured first so that their
+# latency includes the other middleware, static files are answered by WhiteNoise before the
+# rest, CORS headers are added as early as corsheaders requires, responses are compressed
+# after CommonMiddleware has set their length, and reads are routed to the replicas or the
+# primary before the session is loaded.
 MIDDLEWARE = [
+    'TaskRabbit.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'corsheaders.middleware.CorsMiddleware',
+    'TaskRabbit.middleware.CompressionMiddleware',
+    'TaskRabbit.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -85,10 +92,116 @@ WSGI_APPLICATION = 'benmore.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # DATABASE_PATH points the servers started by the benchmarks to their own database.
+        'NAME': os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Transactions take the write lock when they begin, waiting for it up to busy_timeout,
+        # instead of failing when they first write after another writer.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # Connections are kept across requests, with their pragmas and page cache, under WSGI:
+        # benmore.asgi defaults CONN_MAX_AGE to 0.
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas: read-only copies of the default database at the paths, separated by commas,
+# of DATABASE_REPLICA_PATHS, kept up to date outside of the app (see the sync_replicas command).
+# TaskRabbit.routers sends them the reads of the requests that do not write.
+DATABASE_REPLICAS = []
+for i, path in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_PATHS', '').split(','))):
+    alias = f'replica{i + 1}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{os.path.abspath(path)}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['TaskRabbit.routers.PrimaryReplicaRouter']
+# How long the reads of a client go to the primary after it wrote, longer than the replicas lag.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# Unhealthy replicas are checked again after this many seconds.
+REPLICA_HEALTH_INTERVAL = 10
+
+# Pragmas set on every new SQLite connection by TaskRabbit.database, per SQLITE_PROFILE.
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        # With WAL, a crash can only lose the last transactions, never corrupt the database.
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,  # KiB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+# Writes finding the database locked are retried this many times, backing off from 50ms.
+DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES', 5))
+DB_LOCK_BACKOFF = 0.05
+# Seconds a write may spend waiting for the lock, its retries and their busy_timeout included,
+# below the 30s after which gunicorn kills the worker.
+DB_LOCK_MAX_WAIT = int(os.environ.get('DB_LOCK_MAX_WAIT', 20))
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'TaskRabbit.pagination.DateCreatedCursorPagination',
+    # Default page size of the cursor paginated /projects/ and /tasks/ lists, clients
+    # can ask for another one with ?page_size= up to MAX_PAGE_SIZE.
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    # orjson backed JSON, falling back to DRF's when orjson is not installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'TaskRabbit.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'TaskRabbit.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Largest number of tasks accepted by one request to the /tasks/bulk/ endpoints.
+BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 5000))
+
+# Backend of the ?search= parameter on /projects/ and /tasks/, see TaskRabbit.search.
+SEARCH_BACKEND = 'TaskRabbit.search.SQLiteFTSSearchBackend'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default, set CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# and CACHE_LOCATION to a directory to share it between the workers of a host.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'taskrabbit'),
+        'TIMEOUT': int(os.environ.get('CACHE_TTL', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+        },
+    }
+}
+
+# Cache alias and time to live in seconds of the serialized projects, see TaskRabbit.cache.
+PROJECT_CACHE_ALIAS = 'default'
+PROJECT_CACHE_TTL = int(os.environ.get('PROJECT_CACHE_TTL', 300))
+# Lifetime of the cached /projects/stats/ dashboard, which writes do not invalidate.
+STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 30))
+# Projects, by most open tasks, and members, by workload, listed by the dashboard.
+STATS_TOP_ROWS = int(os.environ.get('STATS_TOP_ROWS', 20))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -135,6 +248,67 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL= '/media/'
 MEDIA_ROOT = MEDIA_DIR
 
+# Media is served by TaskRabbit.media.serve_media. MEDIA_ACCEL hands the file transfer to the
+# front server: 'sendfile' sets X-Sendfile, 'accel-redirect' sets X-Accel-Redirect to the
+# file under MEDIA_ACCEL_PREFIX, an nginx internal location aliased to MEDIA_ROOT.
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Max age of media files whose name is not content-addressed, which are cached forever.
+MEDIA_MAX_AGE = 3600
+
+# Response compression by TaskRabbit.middleware.CompressionMiddleware, Brotli being used when
+# the brotli package is installed. Smaller responses are not worth compressing.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+# HTML is left out: the admin and browsable API pages carry CSRF tokens, which compression
+# would expose to BREACH.
+COMPRESSION_CONTENT_TYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript',
+)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Request instrumentation by TaskRabbit.middleware.InstrumentationMiddleware: Server-Timing
+# headers, JSON logs of every request and, if enabled, Prometheus metrics served at /metrics.
+# Server-Timing tells any client how many queries a request ran and how long they took, so it
+# is only sent under DEBUG unless SERVER_TIMING=1.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1' if DEBUG else '0') == '1'
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+# Requests over any of these are logged as warnings and counted as flagged.
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+REQUEST_QUERY_LIMIT = 50
+DUPLICATE_QUERY_LIMIT = 5
+# A statement run this many times in a request, with different parameters or not, is an N+1.
+REPEATED_QUERY_LIMIT = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Only the flagged requests by default, REQUEST_LOG_LEVEL=INFO logs all of them.
+        'TaskRabbit.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Thumbnails rendered for every project photo, see TaskRabbit.thumbnails.
+THUMBNAIL_SIZES = (64, 256, 1024)
+THUMBNAIL_FORMATS = ('webp', 'jpeg')
+
+# Uploaded photos are processed by the run_jobs worker, see TaskRabbit.jobs. JOBS_EAGER
+# runs the jobs inside the request instead, for development without a worker.
+MAX_PHOTO_UPLOAD_SIZE = 10 * 1024 * 1024
+JOBS_EAGER = os.environ.get('JOBS_EAGER') == '1'
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_MAX_RETRY_DELAY = 3600
+
 # CORS_ALLOWED_ORIGINS = [
 #     'http://localhost:5500',
 #     'https://web-production-20fb.up.railway.app',